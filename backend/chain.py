@@ -2,7 +2,9 @@
 RAG pipeline with Groq LLM, retrieval and dialog context.
 """
 
+import asyncio
 import logging
+from functools import lru_cache
 from typing import AsyncIterator
 
 from langchain_groq import ChatGroq
@@ -10,11 +12,29 @@ from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-from backend.config import GROQ_API_KEY, LLM_MODEL, LLM_TEMPERATURE, MAX_HISTORY_MESSAGES
-from backend.retriever import format_sources, search_documents
+from backend.config import (
+    GROQ_API_KEY,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    MAX_HISTORY_MESSAGES,
+    RERANK_ENABLED,
+    STREAM_FLUSH_INTERVAL,
+    TOP_K_RETRIEVE_CANDIDATES,
+)
+from backend.retriever import (
+    embed_query,
+    extract_doc_fields,
+    format_sources,
+    rerank_documents,
+    search_documents,
+)
+from backend.semantic_cache import semantic_cache
 
 logger = logging.getLogger("rag-chatbot")
 
+# Strong references to fire-and-forget tasks (the event loop only keeps weak ones)
+_background_tasks: set[asyncio.Task] = set()
+
 SYSTEM_PROMPT = """Ты корпоративный AI-ассистент.
 Отвечай естественно, понятно и по делу, без канцелярита.
 
@@ -82,22 +102,35 @@ def build_retrieval_query(question: str, chat_history: list[dict]) -> str:
     return "\n".join([*tail, question])
 
 
-def format_docs(docs) -> str:
-    """Format retrieved documents into context block for prompt."""
-    if not docs:
-        return "Документы не найдены."
+def retrieve_documents(retrieval_query: str, query_embedding: list[float]) -> list:
+    """Vector search, optionally followed by cross-encoder reranking (RERANK_ENABLED)."""
+    if not RERANK_ENABLED:
+        return search_documents(retrieval_query, query_embedding=query_embedding)
+
+    candidates = search_documents(
+        retrieval_query,
+        top_k=TOP_K_RETRIEVE_CANDIDATES,
+        query_embedding=query_embedding,
+    )
+    return rerank_documents(retrieval_query, candidates)
 
-    formatted = []
-    for doc in docs:
-        source = doc.metadata.get("source", "unknown")
-        page = doc.metadata.get("page", "?")
-        formatted.append(f"[Источник: {source}, стр. {page}]\n{doc.page_content}")
 
-    return "\n\n---\n\n".join(formatted)
+def format_docs(doc_fields: list[tuple]) -> str:
+    """Format (source, page, content) tuples of retrieved documents into context block for prompt."""
+    if not doc_fields:
+        return "Документы не найдены."
+
+    return "\n\n---\n\n".join(
+        f"[Источник: {source}, стр. {page}]\n{content}" for source, page, content in doc_fields
+    )
 
 
+@lru_cache(maxsize=1)
 def build_rag_chain():
-    """Build LCEL chain: prompt -> LLM -> text parser."""
+    """
+    Build LCEL chain: prompt -> LLM -> text parser.
+    Built once per process so the Groq HTTP connection pool stays warm between turns.
+    """
     llm = get_llm()
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -113,13 +146,18 @@ def get_answer(question: str, chat_history: list[dict]) -> dict:
     """Synchronous answer generation."""
     try:
         retrieval_query = build_retrieval_query(question, chat_history)
-        docs = search_documents(retrieval_query)
-        context = format_docs(docs)
-        sources = format_sources(docs)
+        query_embedding = embed_query(retrieval_query)
+        cached = semantic_cache.lookup(query_embedding)
+        if cached is not None:
+            return cached
+
+        docs = retrieve_documents(retrieval_query, query_embedding)
+        doc_fields = extract_doc_fields(docs)
+        context = format_docs(doc_fields)
+        sources = format_sources(doc_fields)
         history = format_chat_history(chat_history)
 
-        chain = build_rag_chain()
-        answer = chain.invoke(
+        answer = build_rag_chain().invoke(
             {
                 "context": context,
                 "chat_history": history,
@@ -132,6 +170,9 @@ def get_answer(question: str, chat_history: list[dict]) -> dict:
             len(answer),
             len(sources),
         )
+        # An answer produced without any retrieved context must not be replayed from cache
+        if docs:
+            semantic_cache.add(query_embedding, answer, sources)
         return {"answer": answer, "sources": sources}
 
     except Exception as e:
@@ -146,14 +187,34 @@ async def get_answer_stream(question: str, chat_history: list[dict]) -> tuple[As
     """Streaming answer generation."""
     try:
         retrieval_query = build_retrieval_query(question, chat_history)
-        docs = search_documents(retrieval_query)
-        context = format_docs(docs)
-        sources = format_sources(docs)
-        history = format_chat_history(chat_history)
+        # Embedding and ChromaDB search block, so keep them off the event loop
+        # and let history formatting run alongside the embedding model.
+        query_embedding, history = await asyncio.gather(
+            asyncio.to_thread(embed_query, retrieval_query),
+            asyncio.to_thread(format_chat_history, chat_history),
+        )
+        cached = await asyncio.to_thread(semantic_cache.lookup, query_embedding)
+        if cached is not None:
+
+            async def cached_stream():
+                yield cached["answer"]
+
+            return cached_stream(), cached["sources"]
+
+        docs = await asyncio.to_thread(retrieve_documents, retrieval_query, query_embedding)
+        doc_fields = extract_doc_fields(docs)
+        context = format_docs(doc_fields)
+        sources = format_sources(doc_fields)
 
         chain = build_rag_chain()
 
         async def token_stream():
+            # Tokens are coalesced into ~STREAM_FLUSH_INTERVAL windows so the SSE layer
+            # serializes a handful of frames instead of one per token.
+            parts = []
+            buffer = []
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + STREAM_FLUSH_INTERVAL
             try:
                 async for chunk in chain.astream(
                     {
@@ -162,9 +223,27 @@ async def get_answer_stream(question: str, chat_history: list[dict]) -> tuple[As
                         "question": question,
                     }
                 ):
-                    yield chunk
+                    parts.append(chunk)
+                    buffer.append(chunk)
+                    if loop.time() >= deadline:
+                        yield "".join(buffer)
+                        buffer.clear()
+                        deadline = loop.time() + STREAM_FLUSH_INTERVAL
+                if buffer:
+                    yield "".join(buffer)
+                    buffer.clear()
+                # Cache write (possibly an eviction scan) runs in the background so the
+                # sources/done frames are not delayed; skip answers generated without context.
+                if docs:
+                    task = asyncio.create_task(
+                        asyncio.to_thread(semantic_cache.add, query_embedding, "".join(parts), sources)
+                    )
+                    _background_tasks.add(task)
+                    task.add_done_callback(_background_tasks.discard)
             except Exception as e:
                 logger.error("Streaming failed: %s", e)
+                if buffer:
+                    yield "".join(buffer)
                 yield f"\n\nОшибка при генерации ответа: {str(e)}"
 
         logger.info("Streaming started for question: '%s...'", question[:80])
@@ -58,8 +58,19 @@ CHROMA_DB_DIR = BASE_DIR / "chroma_db"
 DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
 CHROMA_DB_DIR.mkdir(parents=True, exist_ok=True)
 
+# Supported document formats (a tuple so it also works with str.endswith)
+ALLOWED_EXTENSIONS = (".pdf", ".docx", ".doc", ".txt")
+
+# Per-document summary (chunk count, pages) kept next to ChromaDB for fast listing
+DOCUMENTS_REGISTRY_PATH = CHROMA_DB_DIR / "documents.sqlite"
+
 # Embeddings
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
+# "auto" picks cuda -> mps -> cpu
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "auto")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# Half precision on CUDA; set to false to roll back to FP32 if retrieval quality drifts
+EMBED_FP16 = os.getenv("EMBED_FP16", "true").lower() in ("1", "true", "yes")
 
 # Chunking
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
@@ -67,21 +78,52 @@ CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
 
 # RAG
 TOP_K_RETRIEVE = int(os.getenv("TOP_K_RETRIEVE", "5"))
+
+# Cross-encoder reranking: fetch more candidates from Chroma, keep TOP_K_RETRIEVE best
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+TOP_K_RETRIEVE_CANDIDATES = int(os.getenv("TOP_K_RETRIEVE_CANDIDATES", "20"))
 MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "12"))
 
+# Semantic answer cache, stored in its own Chroma collection (0 disables it)
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+CACHE_SIM_THRESHOLD = float(os.getenv("CACHE_SIM_THRESHOLD", "0.95"))
+
 # LLM
 LLM_MODEL = os.getenv("LLM_MODEL", "qwen-qwq-32b")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.55"))
+# Streamed tokens are coalesced and flushed to the client at most this often (seconds)
+STREAM_FLUSH_INTERVAL = float(os.getenv("STREAM_FLUSH_INTERVAL", "0.02"))
 
 # OCR
 TESSERACT_CMD = os.getenv("TESSERACT_CMD", r"C:\Program Files\Tesseract-OCR\tesseract.exe")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+# Grayscale render resolution for scanned pages; 200 DPI is enough for 10-12pt body text
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+
+# Ingestion
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+# Chunks per Chroma insert (one embedding pass + one SQLite transaction each)
+CHROMA_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "128"))
+
+# Chroma server (docker-compose "chroma" service); empty host = embedded DB in CHROMA_DB_DIR.
+# The documents registry stays a local file per API instance (see document_registry.py)
+CHROMA_HOST = os.getenv("CHROMA_HOST", "")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8001"))
 
 # Chroma collection
 CHROMA_COLLECTION_NAME = "rag_documents"
+QA_CACHE_COLLECTION_NAME = "qa_cache"
+# HNSW index parameters; applied when the collection is created (reindex into a fresh chroma_db to change)
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "128"))
+HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "64"))
 
 logger.info(f"Директория документов: {DOCUMENTS_DIR}")
 logger.info(f"Директория ChromaDB: {CHROMA_DB_DIR}")
 logger.info(f"Модель эмбеддингов: {EMBEDDING_MODEL}")
 logger.info(f"Размер чанка: {CHUNK_SIZE}, перекрытие: {CHUNK_OVERLAP}")
 logger.info(f"Top-K результатов: {TOP_K_RETRIEVE}")
+if RERANK_ENABLED:
+    logger.info(f"Реранкинг: {RERANK_MODEL} (кандидатов: {TOP_K_RETRIEVE_CANDIDATES})")
 logger.info(f"LLM модель: {LLM_MODEL}")
@@ -0,0 +1,110 @@
+"""
+Реестр проиндексированных документов — sidecar SQLite рядом с ChromaDB.
+Одна строка на файл (source, chunks_count, pages, upload_date): список документов
+читается отсюда, без выгрузки метаданных всех чанков из ChromaDB.
+Обновляется в ingestion при добавлении и удалении чанков.
+
+Таблица meta хранит, с каким хранилищем ChromaDB реестр синхронизирован
+(встроенная БД или адрес Chroma-сервера). Пока отметки нет или хранилище сменилось,
+реестр полностью перестраивается сканом ChromaDB — независимо от числа строк в нём.
+
+Ограничение: реестр — локальный файл этого экземпляра API. Если с одним Chroma-сервером
+(CHROMA_HOST) работают несколько экземпляров API, изменения, сделанные другими
+экземплярами, в локальном реестре не видны до /reindex.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Optional
+
+from backend.config import DOCUMENTS_REGISTRY_PATH
+
+logger = logging.getLogger("rag-chatbot")
+
+# SQLite допускает одного писателя — сериализуем запись из разных потоков
+_write_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """Подключение к реестру (таблицы создаются при первом обращении)."""
+    conn = sqlite3.connect(str(DOCUMENTS_REGISTRY_PATH))
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            source TEXT PRIMARY KEY,
+            chunks_count INTEGER NOT NULL,
+            pages TEXT NOT NULL,
+            upload_date TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    return conn
+
+
+def _to_row(info: dict) -> tuple:
+    return (
+        info["filename"],
+        info["chunks_count"],
+        json.dumps(info["pages"]),
+        info.get("upload_date", ""),
+    )
+
+
+def upsert_documents(documents: list[dict]) -> None:
+    """Добавление/обновление записей вида {filename, chunks_count, pages, upload_date}."""
+    if not documents:
+        return
+    with _write_lock, closing(_connect()) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO documents (source, chunks_count, pages, upload_date) VALUES (?, ?, ?, ?)",
+            [_to_row(info) for info in documents],
+        )
+
+
+def synced_store() -> Optional[str]:
+    """Хранилище ChromaDB, по которому реестр был последний раз восстановлен (None — ни разу)."""
+    with closing(_connect()) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'synced_store'").fetchone()
+    return row[0] if row else None
+
+
+def replace_all(documents: list[dict], store: str) -> None:
+    """Полная перезапись реестра по данным ChromaDB с отметкой о синхронизации с store."""
+    with _write_lock, closing(_connect()) as conn, conn:
+        conn.execute("DELETE FROM documents")
+        conn.executemany(
+            "INSERT INTO documents (source, chunks_count, pages, upload_date) VALUES (?, ?, ?, ?)",
+            [_to_row(info) for info in documents],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_store', ?)",
+            (store,),
+        )
+    logger.info(f"Реестр документов восстановлен: {len(documents)} записей")
+
+
+def delete_document(source: str) -> None:
+    """Удаление записи о документе."""
+    with _write_lock, closing(_connect()) as conn, conn:
+        conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+
+
+def list_documents() -> list[dict]:
+    """Список документов в формате API /documents."""
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            "SELECT source, chunks_count, pages, upload_date FROM documents ORDER BY source"
+        ).fetchall()
+    return [
+        {
+            "filename": source,
+            "chunks_count": chunks_count,
+            "pages": json.loads(pages),
+            "upload_date": upload_date,
+        }
+        for source, chunks_count, pages, upload_date in rows
+    ]
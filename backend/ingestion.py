@@ -4,40 +4,81 @@ Ingestion пайплайн — загрузка, парсинг и индекс
 """
 
 import logging
-import hashlib
+import os
 import re
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Optional
 
 import fitz  # PyMuPDF
 from docx import Document as DocxDocument
-from docx.oxml.table import CT_Tbl
-from docx.oxml.text.paragraph import CT_P
-from docx.table import Table
-from docx.text.paragraph import Paragraph
-from PIL import Image
-import pytesseract
-import io
+from docx.oxml.ns import qn
+import xxhash
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
+from backend import document_registry
 from backend.config import (
+    ALLOWED_EXTENSIONS,
     DOCUMENTS_DIR,
     CHROMA_DB_DIR,
+    CHROMA_HOST,
+    CHROMA_PORT,
     EMBEDDING_MODEL,
+    EMBEDDING_DEVICE,
+    EMBED_BATCH_SIZE,
+    EMBED_FP16,
     CHUNK_SIZE,
     CHUNK_OVERLAP,
     CHROMA_COLLECTION_NAME,
+    HNSW_M,
+    HNSW_CONSTRUCTION_EF,
+    HNSW_SEARCH_EF,
     TESSERACT_CMD,
+    OCR_WORKERS,
+    PDF_OCR_DPI,
+    INGEST_WORKERS,
+    CHROMA_BATCH_SIZE,
 )
 
 logger = logging.getLogger("rag-chatbot")
 
-# Указываем путь к tesseract.exe для Windows
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+# Языки распознавания OCR
+OCR_LANG = "rus+eng+kaz"
+
+# Окружение процессов tesseract: страницы параллелим сами, внутренние OpenMP-потоки
+# tesseract только мешают друг другу. Лимит задаётся только дочернему процессу —
+# в самом API он ограничил бы torch (эмбеддинги и реранкер на CPU) одним потоком
+_TESSERACT_ENV = {**os.environ, "OMP_THREAD_LIMIT": "1"}
+
+# Общий на процесс лимит одновременно запущенных tesseract (загрузка, watcher и /reindex
+# могут распознавать разные PDF одновременно)
+_ocr_slots = threading.BoundedSemaphore(max(1, OCR_WORKERS))
+
+# PyMuPDF не поддерживает многопоточность даже для разных документов —
+# каждое обращение к fitz в процессе идёт под этим lock (OCR выполняется уже без него)
+_pdf_lock = threading.Lock()
+
+# Регулярные выражения нормализации — компилируются один раз при импорте
+_RE_HYPHEN_BREAK = re.compile(r"([A-Za-zА-Яа-яЁё])-\n([A-Za-zА-Яа-яЁё])")
+_RE_WS = re.compile(r"[ \t]+")
+_RE_NEWLINES = re.compile(r"\n{3,}")
+# Любая буква (аналог str.isalpha для текста документов)
+_RE_ALPHA = re.compile(r"[^\W\d_]")
+
+# Минимум букв на странице, при котором текстовый слой PDF считается пригодным
+MIN_PAGE_LETTERS = 40
+
+# Страниц на один запуск tesseract в окне OCR; несжатый PGM при 200 DPI — ~4 МБ на страницу A4,
+# поэтому на диске одновременно не больше OCR_WORKERS × OCR_PAGES_PER_WORKER изображений
+OCR_PAGES_PER_WORKER = 4
 
 
 def normalize_text(text: str) -> str:
@@ -53,9 +94,12 @@ def normalize_text(text: str) -> str:
     cleaned = text.replace("\r\n", "\n").replace("\r", "\n")
     cleaned = cleaned.replace("\u00ad", "")  
     cleaned = cleaned.replace("\xa0", " ")   
-    cleaned = re.sub(r"([A-Za-zА-Яа-яЁё])-\n([A-Za-zА-Яа-яЁё])", r"\1\2", cleaned)
-    cleaned = re.sub(r"[ \t]+", " ", cleaned)
-    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned)
+    # Короткие строки (пустые ячейки, номера) — regex-проходы им ничего не дадут
+    if len(cleaned) < 4:
+        return cleaned.strip()
+    cleaned = _RE_HYPHEN_BREAK.sub(r"\1\2", cleaned)
+    cleaned = _RE_WS.sub(" ", cleaned)
+    cleaned = _RE_NEWLINES.sub("\n\n", cleaned)
     return cleaned.strip()
 
 
@@ -67,17 +111,38 @@ def should_use_ocr(text: str) -> bool:
     if not text or not text.strip():
         return True
 
-    letters = sum(1 for ch in text if ch.isalpha())
-    return letters < 40
+    # Считаем буквы в C-движке regex и останавливаемся, как только порог набран
+    for letters, _ in enumerate(_RE_ALPHA.finditer(text), start=1):
+        if letters >= MIN_PAGE_LETTERS:
+            return False
+    return True
+
+
+# Текст DOCX: w:t — фрагменты текста, w:tab/w:br/w:cr — табуляции и переносы внутри runs.
+# Только runs абзаца и его гиперссылок (как Paragraph.text в python-docx) — без descendant-оси,
+# иначе в абзац попал бы текст вложенных надписей (w:txbxContent), причём дважды:
+# Word хранит их и в mc:Choice, и в mc:Fallback
+_DOCX_TEXT_XPATH = (
+    "./w:r/w:t | ./w:r/w:tab | ./w:r/w:br | ./w:r/w:cr"
+    " | ./w:hyperlink/w:r/w:t | ./w:hyperlink/w:r/w:tab"
+    " | ./w:hyperlink/w:r/w:br | ./w:hyperlink/w:r/w:cr"
+)
+_W_P = qn("w:p")
+_W_T = qn("w:t")
+_W_TAB = qn("w:tab")
 
 
-def iter_docx_blocks(doc: DocxDocument):
-    """Итератор по блокам DOCX в порядке документа: абзацы и таблицы."""
-    for child in doc.element.body.iterchildren():
-        if isinstance(child, CT_P):
-            yield Paragraph(child, doc)
-        elif isinstance(child, CT_Tbl):
-            yield Table(child, doc)
+def docx_element_text(element) -> str:
+    """Текст XML-элемента DOCX (абзаца) одним XPath-проходом в lxml, без обёрток python-docx."""
+    parts = []
+    for node in element.xpath(_DOCX_TEXT_XPATH):
+        if node.tag == _W_T:
+            parts.append(node.text or "")
+        elif node.tag == _W_TAB:
+            parts.append("\t")
+        else:
+            parts.append("\n")
+    return "".join(parts)
 
 
 def get_relative_source(file_path: Path) -> str:
@@ -92,98 +157,257 @@ def get_relative_source(file_path: Path) -> str:
         return file_path.name
 
 
+def get_embedding_device() -> str:
+    """Устройство для модели эмбеддингов: EMBEDDING_DEVICE или автовыбор cuda → mps → cpu."""
+    if EMBEDDING_DEVICE != "auto":
+        return EMBEDDING_DEVICE
+
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+# Модель эмбеддингов загружается один раз на процесс (сотни МБ, несколько секунд)
+_embeddings: Optional[HuggingFaceEmbeddings] = None
+_embeddings_lock = threading.Lock()
+
+
 def get_embeddings() -> HuggingFaceEmbeddings:
-    """Инициализация модели эмбеддингов (all-MiniLM-L6-v2)."""
-    logger.info(f"Загрузка модели эмбеддингов: {EMBEDDING_MODEL}")
+    """Модель эмбеддингов (GPU + FP16, если доступно). Загружается при первом вызове и кэшируется."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = _load_embeddings()
+    return _embeddings
+
+
+def _load_embeddings() -> HuggingFaceEmbeddings:
+    """Инициализация модели эмбеддингов."""
+    device = get_embedding_device()
+    model_kwargs = {"device": device}
+    if device == "cuda" and EMBED_FP16:
+        import torch
+
+        model_kwargs["model_kwargs"] = {"torch_dtype": torch.float16}
+
+    logger.info(f"Загрузка модели эмбеддингов: {EMBEDDING_MODEL} ({device}, batch_size={EMBED_BATCH_SIZE})")
     return HuggingFaceEmbeddings(
         model_name=EMBEDDING_MODEL,
-        model_kwargs={"device": "cpu"},
-        encode_kwargs={"normalize_embeddings": True},
+        model_kwargs=model_kwargs,
+        encode_kwargs={"normalize_embeddings": True, "batch_size": EMBED_BATCH_SIZE},
     )
 
 
+# Запись в индекс (загрузка, watcher, /reindex, удаление) идёт из разных потоков:
+# шаги "старые ID → upsert → удаление устаревших → реестр" выполняются под одним lock,
+# парсинг и OCR — вне его. RLock: ingest_file держит lock вокруг store_chunks
+_index_write_lock = threading.RLock()
+
+# Общий на процесс vectorstore — не переоткрываем ChromaDB на каждый HTTP-запрос
+_vectorstore: Optional[Chroma] = None
+_vectorstore_lock = threading.Lock()
+
+
 def get_vectorstore(embeddings: Optional[HuggingFaceEmbeddings] = None) -> Chroma:
-    """Получение экземпляра ChromaDB vectorstore."""
-    if embeddings is None:
-        embeddings = get_embeddings()
-    return Chroma(
-        collection_name=CHROMA_COLLECTION_NAME,
-        embedding_function=embeddings,
-        persist_directory=str(CHROMA_DB_DIR),
-    )
+    """
+    Получение экземпляра ChromaDB vectorstore (HNSW-индекс с параметрами из конфига).
+    Если задан CHROMA_HOST — подключение к Chroma-серверу, иначе встроенная БД в CHROMA_DB_DIR.
+    Экземпляр создаётся при первом вызове и живёт весь процесс — добавленные
+    и удалённые чанки видны через него сразу, переоткрывать ChromaDB не нужно.
+    """
+    global _vectorstore
+    if _vectorstore is None:
+        with _vectorstore_lock:
+            if _vectorstore is None:
+                if CHROMA_HOST:
+                    # SQLite и hnswlib работают в отдельном процессе сервера
+                    import chromadb
+
+                    location = {"client": chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)}
+                else:
+                    location = {"persist_directory": str(CHROMA_DB_DIR)}
+                _vectorstore = Chroma(
+                    collection_name=CHROMA_COLLECTION_NAME,
+                    embedding_function=embeddings or get_embeddings(),
+                    **location,
+                    collection_metadata={
+                        # Эмбеддинги нормализованы — cosine даёт тот же порядок, что L2, но шкалу 0..2
+                        "hnsw:space": "cosine",
+                        "hnsw:M": HNSW_M,
+                        "hnsw:construction_ef": HNSW_CONSTRUCTION_EF,
+                        "hnsw:search_ef": HNSW_SEARCH_EF,
+                    },
+                )
+                logger.info(f"Vectorstore инициализирован ({CHROMA_HOST or 'embedded'})")
+    return _vectorstore
 
 
 # === Парсеры документов ===
 
-def ocr_page(page) -> str:
-    """OCR одной страницы PDF через pytesseract (для сканированных документов)."""
+def _run_tesseract(image_paths: list[str], list_path: Path) -> list[str]:
+    """Один запуск tesseract на группу изображений. Возвращает текст по страницам."""
+    list_path.write_text("\n".join(image_paths), encoding="utf-8")
+    with _ocr_slots:
+        completed = subprocess.run(
+            [TESSERACT_CMD, str(list_path), "stdout", "-l", OCR_LANG],
+            capture_output=True,
+            env=_TESSERACT_ENV,
+            # Без окна консоли на Windows
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.decode("utf-8", errors="replace").strip())
+    output = completed.stdout.decode("utf-8", errors="replace")
+    # Tesseract разделяет страницы символом form feed
+    page_texts = output.split("\f")
+    if len(page_texts) < len(image_paths):
+        raise RuntimeError(f"получено {len(page_texts)} страниц вместо {len(image_paths)}")
+    return page_texts[: len(image_paths)]
+
+
+def _ocr_window(pdf, page_nums: list[int], tmp_path: Path) -> dict[int, str]:
+    """
+    OCR одного окна страниц: рендеринг во временную папку под _pdf_lock,
+    затем распознавание OCR_WORKERS группами параллельно уже без lock.
+    Изображения окна удаляются сразу после распознавания.
+    """
+    image_paths = []
     try:
-        pix = page.get_pixmap(dpi=300)
-        img_bytes = pix.tobytes("png")
-        image = Image.open(io.BytesIO(img_bytes))
-        text = pytesseract.image_to_string(image, lang="rus+eng+kaz")
-        return text.strip()
-    except Exception as e:
-        logger.warning(f"OCR ошибка на странице: {e}")
-        return ""
+        with _pdf_lock:
+            for page_num in page_nums:
+                # Оттенки серого в несжатом PGM: в 3 раза меньше пикселей, чем RGB, и без PNG-кодека
+                image_path = tmp_path / f"page_{page_num:05d}.pgm"
+                pix = pdf[page_num].get_pixmap(dpi=PDF_OCR_DPI, colorspace=fitz.csGRAY)
+                pix.save(str(image_path))
+                image_paths.append(str(image_path))
+
+        workers = max(1, min(OCR_WORKERS, len(image_paths)))
+        groups = [image_paths[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            group_texts = list(pool.map(
+                _run_tesseract,
+                groups,
+                [tmp_path / f"pages_{i}.txt" for i in range(workers)],
+            ))
+    finally:
+        for image_path in image_paths:
+            Path(image_path).unlink(missing_ok=True)
+
+    results = {}
+    for i, texts in enumerate(group_texts):
+        for page_num, text in zip(page_nums[i::workers], texts):
+            results[page_num] = text.strip()
+    return results
+
+
+def ocr_pages_batch(pdf, page_nums: list[int]) -> dict[int, str]:
+    """
+    OCR нескольких страниц PDF пакетами (для сканированных документов).
+    Страницы обрабатываются окнами по OCR_WORKERS × OCR_PAGES_PER_WORKER: на диске
+    одновременно лежат изображения только одного окна, а не всего документа.
+    Ошибка окна не прерывает распознавание остальных страниц.
+    Возвращает {номер_страницы: текст}.
+    """
+    if not page_nums:
+        return {}
+
+    window = max(1, OCR_WORKERS) * OCR_PAGES_PER_WORKER
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="rag_ocr_") as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        for start in range(0, len(page_nums), window):
+            window_pages = page_nums[start:start + window]
+            try:
+                results.update(_ocr_window(pdf, window_pages, tmp_path))
+            except Exception as e:
+                logger.warning(f"OCR ошибка (стр. {window_pages[0] + 1}–{window_pages[-1] + 1}): {e}")
+    return results
 
 
 def parse_pdf(file_path: Path) -> list[Document]:
     """
     Парсинг PDF файла через PyMuPDF.
-    Если страница не содержит текстового слоя — применяется OCR через pytesseract.
+    Страницы без текстового слоя распознаются через OCR (tesseract) одним пакетом.
+    Обращения к PyMuPDF сериализуются через _pdf_lock; распознавание идёт без него.
     """
     documents = []
+    # Метка времени и source вычисляются один раз на файл, а не на каждую страницу
+    upload_date = datetime.now().isoformat()
+    source = get_relative_source(file_path)
     ocr_used = False
     try:
-        pdf = fitz.open(str(file_path))
-        for page_num in range(len(pdf)):
-            page = pdf[page_num]
-            # Пробуем извлечь текстовый слой
-            text = normalize_text(page.get_text("text"))
+        with _pdf_lock:
+            pdf = fitz.open(str(file_path))
+        try:
+            with _pdf_lock:
+                # Пробуем извлечь текстовый слой
+                page_texts = [normalize_text(page.get_text("text")) for page in pdf]
             # Если текста нет/мусорный текст — пробуем OCR
-            if should_use_ocr(text):
-                ocr_text = normalize_text(ocr_page(page))
-                if ocr_text:
-                    text = ocr_text
-                    ocr_used = True
+            ocr_pages = [page_num for page_num, text in enumerate(page_texts) if should_use_ocr(text)]
+            ocr_texts = ocr_pages_batch(pdf, ocr_pages)
+        finally:
+            with _pdf_lock:
+                pdf.close()
+        for page_num, raw_text in ocr_texts.items():
+            ocr_text = normalize_text(raw_text)
+            if ocr_text:
+                page_texts[page_num] = ocr_text
+                ocr_used = True
+
+        for page_num, text in enumerate(page_texts):
             if text:
                 documents.append(
                     Document(
                         page_content=text,
                         metadata={
-                            "source": get_relative_source(file_path),
+                            "source": source,
                             "page": page_num + 1,
-                            "upload_date": datetime.now().isoformat(),
+                            "upload_date": upload_date,
                         },
                     )
                 )
-        pdf.close()
         method = "OCR" if ocr_used else "текстовый слой"
-        logger.info(f"PDF '{get_relative_source(file_path)}': извлечено {len(documents)} страниц ({method})")
+        logger.info(f"PDF '{source}': извлечено {len(documents)} страниц ({method})")
     except Exception as e:
-        logger.error(f"Ошибка при парсинге PDF '{get_relative_source(file_path)}': {e}")
+        logger.error(f"Ошибка при парсинге PDF '{source}': {e}")
     return documents
 
 
 def parse_docx(file_path: Path) -> list[Document]:
-    """Парсинг DOCX файла через python-docx. Возвращает список Document."""
+    """
+    Парсинг DOCX файла: python-docx открывает пакет, текст абзацев и ячеек таблиц
+    извлекается напрямую XPath-запросами к XML. Возвращает список Document.
+    """
     documents = []
+    upload_date = datetime.now().isoformat()
     try:
         doc = DocxDocument(str(file_path))
         blocks: list[str] = []
 
-        for block in iter_docx_blocks(doc):
-            if isinstance(block, Paragraph):
-                text = normalize_text(block.text)
+        # Абзацы и таблицы верхнего уровня в порядке документа
+        for element in doc.element.body.xpath("./w:p | ./w:tbl"):
+            if element.tag == _W_P:
+                text = normalize_text(docx_element_text(element))
                 if text:
                     blocks.append(text)
-            elif isinstance(block, Table):
-                for row in block.rows:
-                    cells = [normalize_text(cell.text) for cell in row.cells]
-                    cells = [cell for cell in cells if cell]
-                    if cells:
-                        blocks.append(" | ".join(cells))
+                continue
+            for row in element.xpath("./w:tr"):
+                cells = []
+                for cell in row.xpath("./w:tc"):
+                    raw = "\n".join(docx_element_text(p) for p in cell.xpath("./w:p"))
+                    # Пустые ячейки разреженных таблиц пропускаем без нормализации
+                    if not raw or raw.isspace():
+                        continue
+                    text = normalize_text(raw)
+                    if text:
+                        cells.append(text)
+                if cells:
+                    blocks.append(" | ".join(cells))
 
         full_text = "\n".join(blocks)
         if full_text.strip():
@@ -193,7 +417,7 @@ def parse_docx(file_path: Path) -> list[Document]:
                     metadata={
                         "source": get_relative_source(file_path),
                         "page": 1,
-                        "upload_date": datetime.now().isoformat(),
+                        "upload_date": upload_date,
                     },
                 )
             )
@@ -206,6 +430,7 @@ def parse_docx(file_path: Path) -> list[Document]:
 def parse_txt(file_path: Path) -> list[Document]:
     """Парсинг TXT файла. Явно указываем кодировку UTF-8."""
     documents = []
+    upload_date = datetime.now().isoformat()
     try:
         text = normalize_text(file_path.read_text(encoding="utf-8"))
         if text.strip():
@@ -215,7 +440,7 @@ def parse_txt(file_path: Path) -> list[Document]:
                     metadata={
                         "source": get_relative_source(file_path),
                         "page": 1,
-                        "upload_date": datetime.now().isoformat(),
+                        "upload_date": upload_date,
                     },
                 )
             )
@@ -231,7 +456,7 @@ def parse_txt(file_path: Path) -> list[Document]:
                         metadata={
                             "source": get_relative_source(file_path),
                             "page": 1,
-                            "upload_date": datetime.now().isoformat(),
+                            "upload_date": upload_date,
                         },
                     )
                 )
@@ -243,26 +468,68 @@ def parse_txt(file_path: Path) -> list[Document]:
     return documents
 
 
-def parse_doc(file_path: Path) -> list[Document]:
+class WordSession:
     """
-    Парсинг DOC файла (старый формат Word) через pywin32 COM.
-    Требуется Windows с установленным MS Word.
+    Один процесс MS Word (pywin32 COM) на серию .doc файлов — запуск Word занимает секунды.
+    COM инициализируется в потоке, вызвавшем __enter__, поэтому сессия используется
+    только в этом потоке:
+
+        with WordSession() as session:
+            for path in doc_files:
+                parse_doc(path, session)
     """
-    documents = []
-    try:
+
+    def __init__(self):
+        self.word = None
+
+    def __enter__(self) -> "WordSession":
         import pythoncom
         import win32com.client
+
         pythoncom.CoInitialize()
         try:
-            word = win32com.client.Dispatch("Word.Application")
-            word.Visible = False
-            doc = word.Documents.Open(str(file_path.resolve()))
-            text = doc.Content.Text
+            self.word = win32com.client.Dispatch("Word.Application")
+            self.word.Visible = False
+        except Exception:
+            pythoncom.CoUninitialize()
+            raise
+        return self
+
+    def read_text(self, file_path: Path) -> str:
+        """Текст одного документа; Word остаётся запущенным."""
+        doc = self.word.Documents.Open(str(file_path.resolve()))
+        try:
+            return doc.Content.Text
+        finally:
             doc.Close(False)
-            word.Quit()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        import pythoncom
+
+        try:
+            self.word.Quit()
+        except Exception as e:
+            logger.warning(f"Не удалось корректно закрыть MS Word: {e}")
         finally:
+            self.word = None
             pythoncom.CoUninitialize()
 
+
+def parse_doc(file_path: Path, session: Optional[WordSession] = None) -> list[Document]:
+    """
+    Парсинг DOC файла (старый формат Word) через pywin32 COM.
+    Требуется Windows с установленным MS Word.
+    Если передана открытая WordSession — используется она, иначе Word запускается на один файл.
+    """
+    documents = []
+    upload_date = datetime.now().isoformat()
+    try:
+        if session is None:
+            with WordSession() as own_session:
+                text = own_session.read_text(file_path)
+        else:
+            text = session.read_text(file_path)
+
         if text.strip():
             documents.append(
                 Document(
@@ -270,7 +537,7 @@ def parse_doc(file_path: Path) -> list[Document]:
                     metadata={
                         "source": get_relative_source(file_path),
                         "page": 1,
-                        "upload_date": datetime.now().isoformat(),
+                        "upload_date": upload_date,
                     },
                 )
             )
@@ -282,13 +549,18 @@ def parse_doc(file_path: Path) -> list[Document]:
     return documents
 
 
-def parse_file(file_path: Path) -> list[Document]:
-    """Универсальный парсер — определяет тип файла и вызывает нужный парсер."""
+def parse_file(file_path: Path, word_session: Optional[WordSession] = None) -> list[Document]:
+    """
+    Универсальный парсер — определяет тип файла и вызывает нужный парсер.
+    word_session — открытая сессия MS Word для пакетной обработки .doc файлов.
+    """
     suffix = file_path.suffix.lower()
+    if suffix == ".doc":
+        return parse_doc(file_path, word_session)
+
     parsers = {
         ".pdf": parse_pdf,
         ".docx": parse_docx,
-        ".doc": parse_doc,
         ".txt": parse_txt,
     }
     parser = parsers.get(suffix)
@@ -298,15 +570,18 @@ def parse_file(file_path: Path) -> list[Document]:
     return parser(file_path)
 
 
+# Splitter без состояния — создаём один раз и переиспользуем для всех файлов
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len,
+    separators=["\n\n", "\n", ". ", "! ", "? ", "; ", ": ", " ", ""],
+)
+
+
 def split_documents(documents: list[Document]) -> list[Document]:
     """Разбивка документов на чанки заданного размера с перекрытием."""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", "! ", "? ", "; ", ": ", " ", ""],
-    )
-    chunks = text_splitter.split_documents(documents)
+    chunks = _SPLITTER.split_documents(documents)
     logger.info(f"Разбивка: {len(documents)} документов → {len(chunks)} чанков")
     return chunks
 
@@ -314,7 +589,7 @@ def split_documents(documents: list[Document]) -> list[Document]:
 def generate_chunk_id(chunk: Document, index: int) -> str:
     """Генерация уникального ID для чанка на основе содержимого и метаданных."""
     content = f"{chunk.metadata.get('source', '')}_{chunk.metadata.get('page', '')}_{index}_{chunk.page_content[:100]}"
-    return hashlib.md5(content.encode("utf-8")).hexdigest()
+    return xxhash.xxh3_128_hexdigest(content.encode("utf-8"))
 
 
 def delete_document_from_db(filename: str, vectorstore: Optional[Chroma] = None) -> int:
@@ -327,11 +602,14 @@ def delete_document_from_db(filename: str, vectorstore: Optional[Chroma] = None)
 
     # Получаем коллекцию напрямую для фильтрации
     collection = vectorstore._collection
-    results = collection.get(where={"source": filename})
+    with _index_write_lock:
+        results = collection.get(where={"source": filename}, include=[])
+        document_registry.delete_document(filename)
+        if results and results["ids"]:
+            collection.delete(ids=results["ids"])
 
     if results and results["ids"]:
         count = len(results["ids"])
-        collection.delete(ids=results["ids"])
         logger.info(f"Удалено {count} чанков документа '{filename}' из ChromaDB")
         return count
 
@@ -339,48 +617,285 @@ def delete_document_from_db(filename: str, vectorstore: Optional[Chroma] = None)
     return 0
 
 
-def ingest_file(file_path: Path, vectorstore: Optional[Chroma] = None) -> int:
+def prepare_file(file_path: Path, word_session: Optional[WordSession] = None) -> list[Document]:
     """
-    Полный пайплайн загрузки одного файла:
+    Подготовка файла к индексации без обращения к ChromaDB:
     1. Парсинг файла
     2. Разбивка на чанки
-    3. Удаление старых чанков этого файла (дедупликация)
-    4. Добавление новых чанков в ChromaDB
-    Возвращает количество добавленных чанков.
+    Возвращает список чанков (пустой, если текст не извлечён).
     """
-    if vectorstore is None:
-        vectorstore = get_vectorstore()
-
     source_name = get_relative_source(file_path)
     logger.info(f"Начало обработки файла: {source_name}")
 
     # Шаг 1: Парсинг
-    documents = parse_file(file_path)
+    documents = parse_file(file_path, word_session)
     if not documents:
         logger.warning(f"Файл '{source_name}' не содержит текста или не распознан")
-        return 0
+        return []
 
     # Шаг 2: Разбивка на чанки
     chunks = split_documents(documents)
     if not chunks:
         logger.warning(f"Файл '{source_name}': после разбивки нет чанков")
-        return 0
+        return []
+
+    return chunks
 
-    # Шаг 3: Дедупликация — удаляем старые чанки этого файла (по относительному пути)
-    delete_document_from_db(source_name, vectorstore)
 
-    # Шаг 4: Генерация ID и добавление в ChromaDB
+def add_chunks(vectorstore: Chroma, chunks: list[Document], ids: list[str]) -> set[str]:
+    """
+    Добавление чанков в ChromaDB пакетами по CHROMA_BATCH_SIZE
+    (не больше лимита ChromaDB на размер одной вставки).
+    Для каждого пакета эмбеддинги считаются одним вызовом embed_documents
+    и передаются в коллекцию готовыми — одна транзакция ChromaDB на пакет.
+    Ошибка одного пакета не прерывает остальные.
+    Возвращает множество source, чанки которых записаны не полностью.
+    """
+    embeddings = vectorstore.embeddings
+    collection = vectorstore._collection
+    batch_size = max(1, min(CHROMA_BATCH_SIZE, vectorstore._client.get_max_batch_size()))
+    failed_sources = set()
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        texts = [chunk.page_content for chunk in batch]
+        try:
+            collection.upsert(
+                ids=ids[start:start + batch_size],
+                embeddings=embeddings.embed_documents(texts),
+                documents=texts,
+                metadatas=[chunk.metadata for chunk in batch],
+            )
+        except Exception as e:
+            sources = {chunk.metadata.get("source", "unknown") for chunk in batch}
+            logger.error(f"Ошибка записи пакета чанков в ChromaDB ({', '.join(sorted(sources))}): {e}")
+            failed_sources.update(sources)
+    return failed_sources
+
+
+def get_chunk_ids(source_name: str, vectorstore: Chroma) -> set[str]:
+    """ID всех чанков документа в ChromaDB."""
+    return set(vectorstore._collection.get(where={"source": source_name}, include=[])["ids"])
+
+
+def finish_source_update(
+    source_name: str,
+    old_ids: set[str],
+    new_ids: list[str],
+    written: bool,
+    vectorstore: Chroma,
+) -> None:
+    """
+    Завершение замены чанков документа после upsert новых:
+    - новые чанки записаны полностью — удаляем устаревшие (были раньше, в новой версии их нет);
+    - запись не удалась — удаляем частично записанные новые, старая версия остаётся в индексе.
+    ID детерминированы, поэтому совпадающие чанки просто перезаписываются.
+    """
+    if written:
+        to_delete = old_ids.difference(new_ids)
+    else:
+        to_delete = set(new_ids).difference(old_ids)
+    if to_delete:
+        vectorstore._collection.delete(ids=list(to_delete))
+        action = "устаревших" if written else "частично записанных"
+        logger.info(f"Удалено {len(to_delete)} {action} чанков документа '{source_name}'")
+
+
+def store_chunks(source_name: str, chunks: list[Document], vectorstore: Chroma) -> int:
+    """
+    Запись чанков одного файла в ChromaDB:
+    1. Upsert новых чанков (старая версия остаётся доступной для поиска)
+    2. Удаление устаревших чанков этого файла (дедупликация)
+    Возвращает количество добавленных чанков.
+    """
     ids = [generate_chunk_id(chunk, i) for i, chunk in enumerate(chunks)]
-    vectorstore.add_documents(documents=chunks, ids=ids)
+    with _index_write_lock:
+        old_ids = get_chunk_ids(source_name, vectorstore)
+        written = not add_chunks(vectorstore, chunks, ids)
+        finish_source_update(source_name, old_ids, ids, written, vectorstore)
+        if not written:
+            raise RuntimeError(f"не удалось записать чанки файла '{source_name}' в ChromaDB")
+        document_registry.upsert_documents(summarize_documents(chunk.metadata for chunk in chunks))
 
     logger.info(f"✅ Файл '{source_name}': добавлено {len(chunks)} чанков в ChromaDB")
     return len(chunks)
 
 
+def ingest_file(file_path: Path, vectorstore: Optional[Chroma] = None) -> int:
+    """
+    Полный пайплайн загрузки одного файла: prepare_file() + store_chunks().
+    Возвращает количество добавленных чанков.
+    """
+    if vectorstore is None:
+        vectorstore = get_vectorstore()
+
+    chunks = prepare_file(file_path)
+    if not chunks:
+        return 0
+    source_name = get_relative_source(file_path)
+    with _index_write_lock:
+        # Файл могли удалить (DELETE /documents), пока он парсился — не возвращаем его в индекс
+        if not file_path.exists():
+            logger.warning(f"Файл '{source_name}' удалён во время обработки — пропуск")
+            return 0
+        return store_chunks(source_name, chunks, vectorstore)
+
+
+def _prepare_file_safe(file_path: Path, word_session: Optional[WordSession] = None) -> list[Document]:
+    """prepare_file() для пула потоков: ошибка одного файла не прерывает остальные."""
+    try:
+        return prepare_file(file_path, word_session)
+    except Exception as e:
+        logger.error(f"Ошибка при обработке '{get_relative_source(file_path)}': {e}")
+        return []
+
+
+def _prepare_files_sequential(
+    files: list[Path],
+    word_session: Optional[WordSession] = None,
+    on_done: Optional[Callable[[], None]] = None,
+) -> list[list[Document]]:
+    """Последовательная подготовка файлов в одном потоке; on_done вызывается после каждого файла."""
+    results = []
+    for file_path in files:
+        results.append(_prepare_file_safe(file_path, word_session))
+        if on_done is not None:
+            on_done()
+    return results
+
+
+def _prepare_doc_files(
+    files: list[Path],
+    on_done: Optional[Callable[[], None]] = None,
+) -> list[list[Document]]:
+    """
+    Файлы .doc парсятся последовательно в одном потоке через одну WordSession —
+    MS Word запускается один раз на всю пачку и не параллелится через COM.
+    """
+    if not files:
+        return []
+    try:
+        with WordSession() as session:
+            return _prepare_files_sequential(files, session, on_done)
+    except ImportError:
+        logger.error("Для чтения .doc файлов требуется pywin32: pip install pywin32")
+    except Exception as e:
+        logger.error(f"Не удалось запустить MS Word для обработки .doc файлов: {e}")
+    return [[] for _ in files]
+
+
+def _log_progress(done: int, total: int, started: float) -> None:
+    """Прогресс парсинга в формате "N/M — ETA ...с @ X файлов/мин"."""
+    elapsed = time.monotonic() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate else 0.0
+    logger.info(f"📄 {done}/{total} — ETA {eta:.0f}с @ {rate * 60:.1f} файлов/мин")
+
+
+def _store_parsed_files(files: list[Path], parsed: dict[Path, list[Document]]) -> dict:
+    """Запись подготовленных чанков пачки файлов в ChromaDB (вызывается под _index_write_lock)."""
+    # Шаг 2: собираем чанки всех файлов в один общий пакет, запоминая текущие ID каждого файла
+    embeddings = get_embeddings()
+    vectorstore = get_vectorstore(embeddings)
+
+    results = {}
+    prepared: dict[str, tuple[list[Document], list[str], set[str]]] = {}
+    all_chunks: list[Document] = []
+    all_ids: list[str] = []
+    for file_path in files:
+        source_name = get_relative_source(file_path)
+        chunks = parsed[file_path]
+        results[source_name] = 0
+        if not chunks:
+            continue
+        # Файл могли удалить, пока он парсился — не возвращаем его в индекс
+        if not file_path.exists():
+            logger.warning(f"Файл '{source_name}' удалён во время обработки — пропуск")
+            continue
+        try:
+            old_ids = get_chunk_ids(source_name, vectorstore)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке '{source_name}': {e}")
+            continue
+        ids = [generate_chunk_id(chunk, i) for i, chunk in enumerate(chunks)]
+        prepared[source_name] = (chunks, ids, old_ids)
+        all_chunks.extend(chunks)
+        all_ids.extend(ids)
+
+    # Шаг 3: эмбеддинги и upsert в ChromaDB одним пакетом для всех файлов.
+    # Старые чанки не удаляются заранее — до конца записи поиск видит прежнюю версию
+    failed_sources = add_chunks(vectorstore, all_chunks, all_ids) if all_chunks else set()
+
+    # Шаг 4: по каждому файлу — удаление устаревших чанков или откат неудачной записи;
+    # реестр обновляется только для полностью записанных файлов
+    written_chunks: list[Document] = []
+    for source_name, (chunks, ids, old_ids) in prepared.items():
+        written = source_name not in failed_sources
+        try:
+            finish_source_update(source_name, old_ids, ids, written, vectorstore)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке '{source_name}': {e}")
+            continue
+        if written:
+            results[source_name] = len(chunks)
+            written_chunks.extend(chunks)
+    if written_chunks:
+        document_registry.upsert_documents(summarize_documents(chunk.metadata for chunk in written_chunks))
+
+    return results
+
+
+def ingest_files_batch(files: list[Path]) -> dict:
+    """
+    Пакетная индексация списка файлов (используется ingest_directory и watcher).
+    TXT и DOCX парсятся параллельно (INGEST_WORKERS потоков, при 1 — последовательно);
+    PDF (PyMuPDF не поддерживает многопоточность) и DOC (одна сессия Word) — каждый тип
+    последовательно в своём потоке. Затем чанки всех файлов эмбеддятся и записываются
+    в ChromaDB общим пакетом в текущем потоке.
+    Возвращает словарь {относительный_путь: количество_чанков} (0 — файл не проиндексирован).
+    """
+    if not files:
+        return {}
+
+    # Шаг 1: парсинг и разбивка на чанки
+    pdf_files = [f for f in files if f.suffix.lower() == ".pdf"]
+    doc_files = [f for f in files if f.suffix.lower() == ".doc"]
+    other_files = [f for f in files if f.suffix.lower() not in (".pdf", ".doc")]
+
+    started = time.monotonic()
+    done = 0
+    progress_lock = threading.Lock()
+
+    def report_progress() -> None:
+        nonlocal done
+        with progress_lock:
+            done += 1
+            _log_progress(done, len(files), started)
+
+    parsed: dict[Path, list[Document]] = {}
+    if INGEST_WORKERS <= 1:
+        parsed.update(zip(other_files, _prepare_files_sequential(other_files, on_done=report_progress)))
+        parsed.update(zip(pdf_files, _prepare_files_sequential(pdf_files, on_done=report_progress)))
+        parsed.update(zip(doc_files, _prepare_doc_files(doc_files, report_progress)))
+    else:
+        with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+            pdf_future = pool.submit(_prepare_files_sequential, pdf_files, None, report_progress)
+            doc_future = pool.submit(_prepare_doc_files, doc_files, report_progress)
+            futures = {pool.submit(_prepare_file_safe, f): f for f in other_files}
+            for future in as_completed(futures):
+                parsed[futures[future]] = future.result()
+                report_progress()
+            parsed.update(zip(pdf_files, pdf_future.result()))
+            parsed.update(zip(doc_files, doc_future.result()))
+
+    with _index_write_lock:
+        return _store_parsed_files(files, parsed)
+
+
 def ingest_directory(directory: Optional[Path] = None) -> dict:
     """
     Рекурсивная обработка всех файлов из указанной директории и вложенных папок.
     Использует Path.rglob() для обхода на любую глубину вложенности.
+    Файлы индексируются одним пакетом через ingest_files_batch().
     Возвращает словарь {относительный_путь: количество_чанков}.
     """
     if directory is None:
@@ -391,13 +906,12 @@ def ingest_directory(directory: Optional[Path] = None) -> dict:
         return {}
 
     # Поддерживаемые расширения — рекурсивный поиск через rglob
-    extensions = {".pdf", ".docx", ".doc", ".txt"}
-    files = [
+    files = sorted(
         f for f in directory.rglob("*")
         if f.is_file()
-        and f.suffix.lower() in extensions
+        and f.suffix.lower() in ALLOWED_EXTENSIONS
         and not f.name.startswith("~$")  # Игнорируем временные файлы Word
-    ]
+    )
 
     if not files:
         logger.warning(f"В директории '{directory}' (включая вложенные) нет поддерживаемых файлов")
@@ -405,61 +919,58 @@ def ingest_directory(directory: Optional[Path] = None) -> dict:
 
     logger.info(f"Найдено {len(files)} файлов для обработки (рекурсивный обход)")
 
-    # Создаём vectorstore и embeddings один раз для всех файлов
-    embeddings = get_embeddings()
-    vectorstore = get_vectorstore(embeddings)
-
-    results = {}
-    for file_path in sorted(files):
-        source_name = get_relative_source(file_path)
-        try:
-            count = ingest_file(file_path, vectorstore)
-            results[source_name] = count
-        except Exception as e:
-            logger.error(f"Ошибка при обработке '{source_name}': {e}")
-            results[source_name] = 0
+    results = ingest_files_batch(files)
 
     total_chunks = sum(results.values())
     logger.info(f"🎉 Обработка завершена: {len(results)} файлов, {total_chunks} чанков всего")
     return results
 
 
+def summarize_documents(metadatas: Iterable[dict]) -> list[dict]:
+    """
+    Группировка метаданных чанков по файлу.
+    Возвращает список {filename, chunks_count, pages, upload_date}.
+    """
+    doc_info = {}
+    for metadata in metadatas:
+        source = metadata.get("source", "unknown")
+        if source not in doc_info:
+            doc_info[source] = {
+                "filename": source,
+                "chunks_count": 0,
+                "pages": set(),
+                "upload_date": metadata.get("upload_date", ""),
+            }
+        doc_info[source]["chunks_count"] += 1
+        page = metadata.get("page")
+        if page:
+            doc_info[source]["pages"].add(page)
+
+    # Преобразуем set в sorted list для JSON сериализации
+    result = []
+    for info in doc_info.values():
+        info["pages"] = sorted(info["pages"])
+        result.append(info)
+    return result
+
+
 def get_indexed_documents() -> list[dict]:
     """
-    Получение списка всех проиндексированных документов из ChromaDB.
+    Получение списка всех проиндексированных документов.
+    Читается из реестра документов. Если реестр ещё не синхронизирован с текущим
+    хранилищем ChromaDB (база создана до появления реестра или сменился CHROMA_HOST) —
+    реестр один раз восстанавливается полным сканом ChromaDB.
     Возвращает список словарей с информацией о каждом документе.
     """
     try:
-        vectorstore = get_vectorstore()
-        collection = vectorstore._collection
-        all_data = collection.get(include=["metadatas"])
-
-        if not all_data or not all_data["metadatas"]:
-            return []
-
-        # Группируем по имени файла
-        doc_info = {}
-        for metadata in all_data["metadatas"]:
-            source = metadata.get("source", "unknown")
-            if source not in doc_info:
-                doc_info[source] = {
-                    "filename": source,
-                    "chunks_count": 0,
-                    "pages": set(),
-                    "upload_date": metadata.get("upload_date", ""),
-                }
-            doc_info[source]["chunks_count"] += 1
-            page = metadata.get("page")
-            if page:
-                doc_info[source]["pages"].add(page)
-
-        # Преобразуем set в sorted list для JSON сериализации
-        result = []
-        for info in doc_info.values():
-            info["pages"] = sorted(info["pages"])
-            result.append(info)
-
-        return result
+        store = f"{CHROMA_HOST}:{CHROMA_PORT}" if CHROMA_HOST else "embedded"
+        if document_registry.synced_store() == store:
+            return document_registry.list_documents()
+
+        all_data = get_vectorstore()._collection.get(include=["metadatas"])
+        documents = summarize_documents(all_data["metadatas"] or [])
+        document_registry.replace_all(documents, store)
+        return documents
     except Exception as e:
         logger.error(f"Ошибка при получении списка документов: {e}")
         return []
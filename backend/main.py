@@ -1,41 +1,112 @@
 """
 FastAPI РїСЂРёР»РѕР¶РµРЅРёРµ вЂ” Р±СЌРєРµРЅРґ RAG С‡Р°С‚-Р±РѕС‚Р°.
-Р­РЅРґРїРѕРёРЅС‚С‹: /chat (СЃС‚СЂРёРјРёРЅРі), /upload, /documents, /documents/{filename} (DELETE).
+Р­РЅРґРїРѕРёРЅС‚С‹: /chat (СЃС‚СЂРёРјРёРЅРі), /upload, /upload/{job_id}, /documents, /documents/{filename} (DELETE).
 """
 
-import json
+import asyncio
 import logging
-import shutil
+import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional
 
+import aiofiles
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+import orjson
 from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
 
-from backend.config import DOCUMENTS_DIR, logger
+from backend.config import ALLOWED_EXTENSIONS, DOCUMENTS_DIR, logger
 from backend.ingestion import (
     ingest_file,
     ingest_directory,
-    get_vectorstore,
-    get_embeddings,
-    get_indexed_documents,
     delete_document_from_db,
     get_relative_source,
 )
 from backend.chain import get_answer, get_answer_stream
-from backend.retriever import reset_vectorstore_cache
+from backend.retriever import get_cached_documents, reset_vectorstore_cache
+
+
+# === SSE-РєР°РґСЂС‹ ===
+# РРЅС‚РµСЂРІР°Р» ping-РєРѕРјРјРµРЅС‚Р°СЂРёРµРІ SSE (СЃРµРєСѓРЅРґС‹)
+SSE_PING_INTERVAL = 15
+
+# РљР°РґСЂС‹ СЃРѕР±РёСЂР°СЋС‚СЃСЏ РёР· РіРѕС‚РѕРІС‹С… Р±Р°Р№С‚РѕРІ: orjson СЃРµСЂРёР°Р»РёР·СѓРµС‚ С‚РѕР»СЊРєРѕ content, Р±РµР· СЃР±РѕСЂРєРё dict
+_TOKEN_PREFIX = b'data: {"type":"token","content":'
+_SOURCES_PREFIX = b'data: {"type":"sources","content":'
+_ERROR_PREFIX = b'data: {"type":"error","content":'
+_FRAME_SUFFIX = b"}\n\n"
+# РљР°РґСЂ Р·Р°РІРµСЂС€РµРЅРёСЏ РЅРµ Р·Р°РІРёСЃРёС‚ РѕС‚ Р·Р°РїСЂРѕСЃР°
+_DONE_FRAME = b'data: {"type":"done"}\n\n'
+
+
+# === РћС‡РµСЂРµРґСЊ РёРЅРґРµРєСЃР°С†РёРё Р·Р°РіСЂСѓР¶РµРЅРЅС‹С… С„Р°Р№Р»РѕРІ ===
+# Р—Р°РґР°С‡Рё {job_id: {job_id, status, filename, chunks_count, message}};
+# status: queued в†’ processing в†’ ok | error
+_upload_jobs: dict[str, dict] = {}
+_upload_queue: Optional[asyncio.Queue] = None
+
+# РЎРєРѕР»СЊРєРѕ Р·Р°РґР°С‡ С…СЂР°РЅРёС‚СЊ РґР»СЏ РѕРїСЂРѕСЃР° СЃС‚Р°С‚СѓСЃР° (Р·Р°РІРµСЂС€С‘РЅРЅС‹Рµ РІС‹С‚РµСЃРЅСЏСЋС‚СЃСЏ РїРµСЂРІС‹РјРё)
+MAX_UPLOAD_JOBS = 500
+
+# Р Р°Р·РјРµСЂ Р±Р»РѕРєР° РїСЂРё Р·Р°РїРёСЃРё Р·Р°РіСЂСѓР¶Р°РµРјРѕРіРѕ С„Р°Р№Р»Р° РЅР° РґРёСЃРє (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _register_upload_job(job: dict) -> None:
+    """РЎРѕС…СЂР°РЅСЏРµС‚ Р·Р°РґР°С‡Сѓ Рё СѓРґР°Р»СЏРµС‚ СЃР°РјС‹Рµ СЃС‚Р°СЂС‹Рµ Р·Р°РІРµСЂС€С‘РЅРЅС‹Рµ, РµСЃР»Рё РёС… СЃР»РёС€РєРѕРј РјРЅРѕРіРѕ."""
+    _upload_jobs[job["job_id"]] = job
+    if len(_upload_jobs) <= MAX_UPLOAD_JOBS:
+        return
+    finished = [job_id for job_id, j in _upload_jobs.items() if j["status"] in ("ok", "error")]
+    for job_id in finished[: len(_upload_jobs) - MAX_UPLOAD_JOBS]:
+        del _upload_jobs[job_id]
+
+
+async def _upload_worker(queue: asyncio.Queue):
+    """Р¤РѕРЅРѕРІС‹Р№ РѕР±СЂР°Р±РѕС‚С‡РёРє РѕС‡РµСЂРµРґРё: РёРЅРґРµРєСЃРёСЂСѓРµС‚ С„Р°Р№Р»С‹ РїРѕ РѕРґРЅРѕРјСѓ РІ РѕС‚РґРµР»СЊРЅРѕРј РїРѕС‚РѕРєРµ."""
+    while True:
+        job_id, file_path = await queue.get()
+        job = _upload_jobs.get(job_id)
+        if job is None:
+            queue.task_done()
+            continue
+        job["status"] = "processing"
+        try:
+            # РџР°СЂСЃРёРЅРі, СЌРјР±РµРґРґРёРЅРіРё Рё Р·Р°РїРёСЃСЊ РІ ChromaDB вЂ” РІРЅРµ event loop
+            chunks_count = await asyncio.to_thread(ingest_file, file_path)
+
+            # РЎР±СЂР°СЃС‹РІР°РµРј РєСЌС€ retriever С‡С‚РѕР±С‹ РЅРѕРІС‹Рµ РґР°РЅРЅС‹Рµ Р±С‹Р»Рё РґРѕСЃС‚СѓРїРЅС‹
+            await asyncio.to_thread(reset_vectorstore_cache)
+
+            logger.info(f"РРЅРґРµРєСЃР°С†РёСЏ '{job['filename']}' Р·Р°РІРµСЂС€РµРЅР°: {chunks_count} С‡Р°РЅРєРѕРІ")
+            job.update(
+                status="ok",
+                chunks_count=chunks_count,
+                message=f"Р¤Р°Р№Р» '{job['filename']}' Р·Р°РіСЂСѓР¶РµРЅ Рё РїСЂРѕРёРЅРґРµРєСЃРёСЂРѕРІР°РЅ ({chunks_count} С‡Р°РЅРєРѕРІ)",
+            )
+        except Exception as e:
+            logger.error(f"РћС€РёР±РєР° РёРЅРґРµРєСЃР°С†РёРё С„Р°Р№Р»Р° '{job['filename']}': {e}")
+            job.update(status="error", message=f"РћС€РёР±РєР° РёРЅРґРµРєСЃР°С†РёРё: {str(e)}")
+        finally:
+            queue.task_done()
 
 
-# === Lifespan вЂ” Р·Р°РїСѓСЃРє/РѕСЃС‚Р°РЅРѕРІРєР° watchdog РїСЂРё СЃС‚Р°СЂС‚Рµ/РѕСЃС‚Р°РЅРѕРІРєРµ СЃРµСЂРІРµСЂР° ===
+# === Lifespan вЂ” Р·Р°РїСѓСЃРє/РѕСЃС‚Р°РЅРѕРІРєР° С„РѕРЅРѕРІС‹С… Р·Р°РґР°С‡ РїСЂРё СЃС‚Р°СЂС‚Рµ/РѕСЃС‚Р°РЅРѕРІРєРµ СЃРµСЂРІРµСЂР° ===
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global _upload_queue
+
+    # Startup: РѕС‡РµСЂРµРґСЊ РёРЅРґРµРєСЃР°С†РёРё Р·Р°РіСЂСѓР¶РµРЅРЅС‹С… С„Р°Р№Р»РѕРІ
+    _upload_queue = asyncio.Queue()
+    upload_worker = asyncio.create_task(_upload_worker(_upload_queue))
+
     # Startup: Р·Р°РїСѓСЃРєР°РµРј РјРѕРЅРёС‚РѕСЂРёРЅРі РїР°РїРєРё documents/
     logger.info("Watcher is temporarily disabled. Use POST /reindex manually.")
     yield
-    # Shutdown: РѕСЃС‚Р°РЅР°РІР»РёРІР°РµРј РјРѕРЅРёС‚РѕСЂРёРЅРі
+    # Shutdown: РѕСЃС‚Р°РЅР°РІР»РёРІР°РµРј РјРѕРЅРёС‚РѕСЂРёРЅРі Рё РѕР±СЂР°Р±РѕС‚С‡РёРє РѕС‡РµСЂРµРґРё
+    upload_worker.cancel()
 
 
 # === FastAPI РїСЂРёР»РѕР¶РµРЅРёРµ ===
@@ -112,30 +183,23 @@ async def chat(request: ChatRequest):
         try:
             # РЎС‚СЂРёРјРёРј С‚РѕРєРµРЅС‹ РѕС‚РІРµС‚Р°
             async for token in token_stream:
-                data = json.dumps({"type": "token", "content": token}, ensure_ascii=False)
-                yield f"data: {data}\n\n"
+                yield _TOKEN_PREFIX + orjson.dumps(token) + _FRAME_SUFFIX
 
             # РћС‚РїСЂР°РІР»СЏРµРј РёСЃС‚РѕС‡РЅРёРєРё РїРѕСЃР»Рµ Р·Р°РІРµСЂС€РµРЅРёСЏ РѕС‚РІРµС‚Р°
-            sources_data = json.dumps({"type": "sources", "content": sources}, ensure_ascii=False)
-            yield f"data: {sources_data}\n\n"
+            yield _SOURCES_PREFIX + orjson.dumps(sources) + _FRAME_SUFFIX
 
             # РЎРёРіРЅР°Р» Р·Р°РІРµСЂС€РµРЅРёСЏ
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+            yield _DONE_FRAME
 
         except Exception as e:
             logger.error(f"РћС€РёР±РєР° РІ SSE СЃС‚СЂРёРјРµ: {e}")
-            error_data = json.dumps({"type": "error", "content": str(e)}, ensure_ascii=False)
-            yield f"data: {error_data}\n\n"
-
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
-    )
+            yield _ERROR_PREFIX + orjson.dumps(str(e)) + _FRAME_SUFFIX
+
+    # EventSourceResponse СЃР°Рј РІС‹СЃС‚Р°РІР»СЏРµС‚ SSE-Р·Р°РіРѕР»РѕРІРєРё (no-cache, X-Accel-Buffering: no)
+    # Рё С€Р»С‘С‚ ping-РєРѕРјРјРµРЅС‚Р°СЂРёРё РєР°Р¶РґС‹Рµ SSE_PING_INTERVAL СЃРµРєСѓРЅРґ, С‡С‚РѕР±С‹ РїСЂРѕРєСЃРё РЅРµ СЂРІР°Р»Рё
+    # РґРѕР»РіРёРµ РіРµРЅРµСЂР°С†РёРё. Р“РѕС‚РѕРІС‹Рµ bytes-РєР°РґСЂС‹ РїРµСЂРµРґР°СЋС‚СЃСЏ РєР»РёРµРЅС‚Сѓ Р±РµР· РёР·РјРµРЅРµРЅРёР№;
+    # sep="\n" вЂ” С„СЂРѕРЅС‚РµРЅРґ РґРµР»РёС‚ РїРѕС‚РѕРє РЅР° СЃРѕР±С‹С‚РёСЏ РїРѕ "\n\n".
+    return EventSourceResponse(event_generator(), ping=SSE_PING_INTERVAL, sep="\n")
 
 
 @app.post("/chat/sync", tags=["Р§Р°С‚"])
@@ -148,64 +212,69 @@ async def chat_sync(request: ChatRequest):
         raise HTTPException(status_code=400, detail="Р’РѕРїСЂРѕСЃ РЅРµ РјРѕР¶РµС‚ Р±С‹С‚СЊ РїСѓСЃС‚С‹Рј")
 
     logger.info(f"POST /chat/sync вЂ” РІРѕРїСЂРѕСЃ: '{request.question[:80]}...'")
-    result = get_answer(request.question, request.chat_history)
+    # get_answer Р±Р»РѕРєРёСЂСѓСЋС‰РёР№ (СЌРјР±РµРґРґРёРЅРі, РїРѕРёСЃРє, LLM) вЂ” РІС‹РїРѕР»РЅСЏРµРј РІРЅРµ event loop
+    result = await asyncio.to_thread(get_answer, request.question, request.chat_history)
     return ChatResponse(**result)
 
 
-@app.post("/upload", tags=["Р”РѕРєСѓРјРµРЅС‚С‹"])
+@app.post("/upload", tags=["Р”РѕРєСѓРјРµРЅС‚С‹"], status_code=202)
 async def upload_file(file: UploadFile = File(...)):
     """
-    Р—Р°РіСЂСѓР·РєР° С„Р°Р№Р»Р° Рё РёРЅРґРµРєСЃР°С†РёСЏ РІ ChromaDB.
+    Р—Р°РіСЂСѓР·РєР° С„Р°Р№Р»Р° Рё РїРѕСЃС‚Р°РЅРѕРІРєР° РІ РѕС‡РµСЂРµРґСЊ РЅР° РёРЅРґРµРєСЃР°С†РёСЋ РІ ChromaDB.
     РџРѕРґРґРµСЂР¶РёРІР°РµРјС‹Рµ С„РѕСЂРјР°С‚С‹: PDF, DOCX, TXT.
     Р•СЃР»Рё С„Р°Р№Р» СѓР¶Рµ СЃСѓС‰РµСЃС‚РІСѓРµС‚ вЂ” РїРµСЂРµР·Р°РїРёСЃС‹РІР°РµС‚СЃСЏ (РґРµРґСѓРїР»РёРєР°С†РёСЏ).
+    Р’РѕР·РІСЂР°С‰Р°РµС‚ 202 Рё job_id; СЃС‚Р°С‚СѓСЃ РёРЅРґРµРєСЃР°С†РёРё вЂ” GET /upload/{job_id}.
     """
     # РџСЂРѕРІРµСЂСЏРµРј СЂР°СЃС€РёСЂРµРЅРёРµ С„Р°Р№Р»Р°
-    allowed_extensions = {".pdf", ".docx", ".doc", ".txt"}
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in allowed_extensions:
+    if not file.filename.lower().endswith(ALLOWED_EXTENSIONS):
+        file_ext = Path(file.filename).suffix.lower()
         raise HTTPException(
             status_code=400,
-            detail=f"РќРµРїРѕРґРґРµСЂР¶РёРІР°РµРјС‹Р№ С„РѕСЂРјР°С‚ С„Р°Р№Р»Р°: {file_ext}. Р”РѕРїСѓСЃС‚РёРјС‹Рµ: {', '.join(allowed_extensions)}",
+            detail=f"РќРµРїРѕРґРґРµСЂР¶РёРІР°РµРјС‹Р№ С„РѕСЂРјР°С‚ С„Р°Р№Р»Р°: {file_ext}. Р”РѕРїСѓСЃС‚РёРјС‹Рµ: {', '.join(ALLOWED_EXTENSIONS)}",
         )
 
     # РЎРѕС…СЂР°РЅСЏРµРј С„Р°Р№Р» РЅР° РґРёСЃРє
     file_path = DOCUMENTS_DIR / file.filename
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        async with aiofiles.open(file_path, "wb") as buffer:
+            # РџРёС€РµРј Р±Р»РѕРєР°РјРё вЂ” С„Р°Р№Р» С†РµР»РёРєРѕРј РІ РїР°РјСЏС‚СЊ РЅРµ С‡РёС‚Р°РµС‚СЃСЏ, event loop РЅРµ Р±Р»РѕРєРёСЂСѓРµС‚СЃСЏ
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await buffer.write(chunk)
         logger.info(f"POST /upload вЂ” С„Р°Р№Р» СЃРѕС…СЂР°РЅС‘РЅ: {file.filename}")
     except Exception as e:
         logger.error(f"РћС€РёР±РєР° СЃРѕС…СЂР°РЅРµРЅРёСЏ С„Р°Р№Р»Р°: {e}")
         raise HTTPException(status_code=500, detail=f"РћС€РёР±РєР° СЃРѕС…СЂР°РЅРµРЅРёСЏ С„Р°Р№Р»Р°: {str(e)}")
 
-    # РРЅРґРµРєСЃРёСЂСѓРµРј С„Р°Р№Р»
-    try:
-        embeddings = get_embeddings()
-        vectorstore = get_vectorstore(embeddings)
-        chunks_count = ingest_file(file_path, vectorstore)
-
-        # РЎР±СЂР°СЃС‹РІР°РµРј РєСЌС€ retriever С‡С‚РѕР±С‹ РЅРѕРІС‹Рµ РґР°РЅРЅС‹Рµ Р±С‹Р»Рё РґРѕСЃС‚СѓРїРЅС‹
-        reset_vectorstore_cache()
-
-        # РћС‚РЅРѕСЃРёС‚РµР»СЊРЅС‹Р№ РїСѓС‚СЊ РґР»СЏ РєРѕРЅСЃРёСЃС‚РµРЅС‚РЅРѕСЃС‚Рё СЃ metadata source
-        source_name = get_relative_source(file_path)
-        logger.info(f"POST /upload вЂ” РёРЅРґРµРєСЃР°С†РёСЏ Р·Р°РІРµСЂС€РµРЅР°: {chunks_count} С‡Р°РЅРєРѕРІ")
-        return {
-            "status": "ok",
-            "filename": source_name,
-            "chunks_count": chunks_count,
-            "message": f"Р¤Р°Р№Р» '{source_name}' Р·Р°РіСЂСѓР¶РµРЅ Рё РїСЂРѕРёРЅРґРµРєСЃРёСЂРѕРІР°РЅ ({chunks_count} С‡Р°РЅРєРѕРІ)",
-        }
-    except Exception as e:
-        logger.error(f"РћС€РёР±РєР° РёРЅРґРµРєСЃР°С†РёРё С„Р°Р№Р»Р°: {e}")
-        raise HTTPException(status_code=500, detail=f"РћС€РёР±РєР° РёРЅРґРµРєСЃР°С†РёРё: {str(e)}")
+    # РЎС‚Р°РІРёРј С„Р°Р№Р» РІ РѕС‡РµСЂРµРґСЊ РЅР° РёРЅРґРµРєСЃР°С†РёСЋ
+    # РћС‚РЅРѕСЃРёС‚РµР»СЊРЅС‹Р№ РїСѓС‚СЊ РґР»СЏ РєРѕРЅСЃРёСЃС‚РµРЅС‚РЅРѕСЃС‚Рё СЃ metadata source
+    source_name = get_relative_source(file_path)
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "status": "queued",
+        "filename": source_name,
+        "chunks_count": 0,
+        "message": f"Р¤Р°Р№Р» '{source_name}' Р·Р°РіСЂСѓР¶РµРЅ Рё РїРѕСЃС‚Р°РІР»РµРЅ РІ РѕС‡РµСЂРµРґСЊ РЅР° РёРЅРґРµРєСЃР°С†РёСЋ",
+    }
+    _register_upload_job(job)
+    _upload_queue.put_nowait((job["job_id"], file_path))
+    logger.info(f"POST /upload вЂ” Р·Р°РґР°С‡Р° {job['job_id']} РїРѕСЃС‚Р°РІР»РµРЅР° РІ РѕС‡РµСЂРµРґСЊ")
+    return job
+
+
+@app.get("/upload/{job_id}", tags=["Р”РѕРєСѓРјРµРЅС‚С‹"])
+async def upload_status(job_id: str):
+    """РЎС‚Р°С‚СѓСЃ РёРЅРґРµРєСЃР°С†РёРё Р·Р°РіСЂСѓР¶РµРЅРЅРѕРіРѕ С„Р°Р№Р»Р°: queued, processing, ok РёР»Рё error."""
+    job = _upload_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Р—Р°РґР°С‡Р° '{job_id}' РЅРµ РЅР°Р№РґРµРЅР°")
+    return job
 
 
 @app.get("/documents", tags=["Р”РѕРєСѓРјРµРЅС‚С‹"])
 async def list_documents():
     """РџРѕР»СѓС‡РµРЅРёРµ СЃРїРёСЃРєР° РІСЃРµС… Р·Р°РіСЂСѓР¶РµРЅРЅС‹С… Рё РїСЂРѕРёРЅРґРµРєСЃРёСЂРѕРІР°РЅРЅС‹С… РґРѕРєСѓРјРµРЅС‚РѕРІ."""
     try:
-        documents = get_indexed_documents()
+        documents = await asyncio.to_thread(get_cached_documents)
         logger.info(f"GET /documents вЂ” РЅР°Р№РґРµРЅРѕ {len(documents)} РґРѕРєСѓРјРµРЅС‚РѕРІ")
         return {"status": "ok", "documents": documents}
     except Exception as e:
@@ -219,17 +288,18 @@ async def delete_document(filename: str):
     РЈРґР°Р»РµРЅРёРµ РґРѕРєСѓРјРµРЅС‚Р° РёР· ChromaDB Рё СЃ РґРёСЃРєР°.
     """
     try:
-        # РЈРґР°Р»СЏРµРј РёР· ChromaDB
-        deleted_count = delete_document_from_db(filename)
-
-        # РЈРґР°Р»СЏРµРј С„Р°Р№Р» СЃ РґРёСЃРєР°
+        # РЎРЅР°С‡Р°Р»Р° СѓРґР°Р»СЏРµРј С„Р°Р№Р» СЃ РґРёСЃРєР°: РёРЅРґРµРєСЃР°С†РёСЏ, РєРѕС‚РѕСЂР°СЏ СЃРµР№С‡Р°СЃ РїР°СЂСЃРёС‚ СЌС‚РѕС‚ С„Р°Р№Р»,
+        # СѓРІРёРґРёС‚ СЌС‚Рѕ РїРѕРґ lock Р·Р°РїРёСЃРё РІ ingestion Рё РЅРµ РІРµСЂРЅС‘С‚ РµРіРѕ С‡Р°РЅРєРё РІ РёРЅРґРµРєСЃ
         file_path = DOCUMENTS_DIR / filename
         if file_path.exists():
             file_path.unlink()
             logger.info(f"DELETE /documents/{filename} вЂ” С„Р°Р№Р» СѓРґР°Р»С‘РЅ СЃ РґРёСЃРєР°")
 
+        # РЈРґР°Р»СЏРµРј РёР· ChromaDB
+        deleted_count = await asyncio.to_thread(delete_document_from_db, filename)
+
         # РЎР±СЂР°СЃС‹РІР°РµРј РєСЌС€ retriever
-        reset_vectorstore_cache()
+        await asyncio.to_thread(reset_vectorstore_cache)
 
         if deleted_count > 0:
             return {
@@ -256,8 +326,9 @@ async def reindex():
     """
     try:
         logger.info("POST /reindex вЂ” Р·Р°РїСѓСЃРє РїРѕР»РЅРѕР№ РїРµСЂРµРёРЅРґРµРєСЃР°С†РёРё")
-        results = ingest_directory()
-        reset_vectorstore_cache()
+        # РЎРёРЅС…СЂРѕРЅРЅС‹Р№ РїР°Р№РїР»Р°Р№РЅ ChromaDB вЂ” РІ РѕС‚РґРµР»СЊРЅРѕРј РїРѕС‚РѕРєРµ, С‡С‚РѕР±С‹ РЅРµ Р±Р»РѕРєРёСЂРѕРІР°С‚СЊ С‡Р°С‚
+        results = await asyncio.to_thread(ingest_directory)
+        await asyncio.to_thread(reset_vectorstore_cache)
 
         total_chunks = sum(results.values())
         logger.info(f"POST /reindex вЂ” Р·Р°РІРµСЂС€РµРЅРѕ: {len(results)} С„Р°Р№Р»РѕРІ, {total_chunks} С‡Р°РЅРєРѕРІ")
@@ -4,44 +4,58 @@ Retriever — поиск релевантных чанков в ChromaDB.
 """
 
 import logging
-from langchain_chroma import Chroma
+import threading
+from functools import lru_cache
+from typing import Optional
+
 from langchain_core.documents import Document
 
-from backend.config import TOP_K_RETRIEVE
-from backend.ingestion import get_vectorstore, get_embeddings
+from backend.config import RERANK_MODEL, TOP_K_RETRIEVE
+from backend.ingestion import get_indexed_documents, get_vectorstore
+from backend.semantic_cache import semantic_cache
 
 logger = logging.getLogger("rag-chatbot")
 
-# Кэшируем embeddings и vectorstore для переиспользования
-_embeddings = None
-_vectorstore = None
-
+# Cross-encoder для реранкинга загружается при первом использовании
+_reranker = None
+_reranker_lock = threading.Lock()
 
-def _get_cached_vectorstore() -> Chroma:
-    """Получение кэшированного vectorstore (создаётся один раз)."""
-    global _embeddings, _vectorstore
-    if _vectorstore is None:
-        _embeddings = get_embeddings()
-        _vectorstore = get_vectorstore(_embeddings)
-        logger.info("Vectorstore инициализирован и закэширован")
-    return _vectorstore
+# Кэш списка документов — сбрасывается в reset_vectorstore_cache() после любых изменений
+_documents_cache: Optional[list[dict]] = None
+_documents_cache_lock = threading.Lock()
 
 
 def reset_vectorstore_cache():
-    """Сброс кэша vectorstore (нужен после загрузки новых документов)."""
-    global _embeddings, _vectorstore
-    _embeddings = None
-    _vectorstore = None
-    logger.info("Кэш vectorstore сброшен")
-
-
-def get_retriever(top_k: int = TOP_K_RETRIEVE):
     """
-    Создание retriever для поиска по ChromaDB.
-    Возвращает LangChain-совместимый retriever с поиском по similarity.
+    Сброс кэшей, зависящих от набора документов (нужен после загрузки и удаления).
+    Vectorstore и модель эмбеддингов не пересоздаются — они видят изменения сразу.
     """
-    vectorstore = _get_cached_vectorstore()
-    retriever = vectorstore.as_retriever(
+    global _documents_cache
+    with _documents_cache_lock:
+        _documents_cache = None
+    # Ответы из семантического кэша могли опираться на изменившиеся документы
+    semantic_cache.clear()
+    logger.info("Кэш списка документов и ответов сброшен")
+
+
+def get_cached_documents() -> list[dict]:
+    """Список проиндексированных документов; пересчитывается только после изменений индекса."""
+    global _documents_cache
+    with _documents_cache_lock:
+        if _documents_cache is None:
+            _documents_cache = get_indexed_documents()
+        return _documents_cache
+
+
+def embed_query(query: str) -> list[float]:
+    """Эмбеддинг запроса той же моделью, что используется для поиска."""
+    return get_vectorstore().embeddings.embed_query(query)
+
+
+@lru_cache(maxsize=8)
+def _build_retriever(top_k: int):
+    """Retriever для заданного top_k — создаётся один раз поверх общего vectorstore."""
+    retriever = get_vectorstore().as_retriever(
         search_type="similarity",
         search_kwargs={"k": top_k},
     )
@@ -49,15 +63,31 @@ def get_retriever(top_k: int = TOP_K_RETRIEVE):
     return retriever
 
 
-def search_documents(query: str, top_k: int = TOP_K_RETRIEVE) -> list[Document]:
+def get_retriever(top_k: int = TOP_K_RETRIEVE):
+    """
+    Retriever для поиска по ChromaDB.
+    Возвращает LangChain-совместимый retriever с поиском по similarity.
+    """
+    return _build_retriever(top_k)
+
+
+def search_documents(
+    query: str,
+    top_k: int = TOP_K_RETRIEVE,
+    query_embedding: Optional[list[float]] = None,
+) -> list[Document]:
     """
     Прямой поиск документов по запросу.
+    Если эмбеддинг запроса уже посчитан — ищем по нему, не вызывая модель повторно.
     Возвращает список Document с метаданными (source, page).
     """
-    vectorstore = _get_cached_vectorstore()
+    vectorstore = get_vectorstore()
     try:
-        results = vectorstore.similarity_search(query, k=top_k)
-        logger.info(f"Поиск '{query[:50]}...': найдено {len(results)} результатов")
+        if query_embedding is not None:
+            results = vectorstore.similarity_search_by_vector(query_embedding, k=top_k)
+        else:
+            results = vectorstore.similarity_search(query, k=top_k)
+        logger.info("Поиск '%.50s...': найдено %d результатов", query, len(results))
         return results
     except Exception as e:
         logger.error(f"Ошибка при поиске: {e}")
@@ -69,32 +99,70 @@ def search_with_scores(query: str, top_k: int = TOP_K_RETRIEVE) -> list[tuple[Do
     Поиск документов с оценкой релевантности.
     Возвращает список кортежей (Document, score).
     """
-    vectorstore = _get_cached_vectorstore()
+    vectorstore = get_vectorstore()
     try:
         results = vectorstore.similarity_search_with_score(query, k=top_k)
-        logger.info(f"Поиск с оценками '{query[:50]}...': найдено {len(results)} результатов")
+        logger.info("Поиск с оценками '%.50s...': найдено %d результатов", query, len(results))
         return results
     except Exception as e:
         logger.error(f"Ошибка при поиске с оценками: {e}")
         return []
 
 
-def format_sources(documents: list[Document]) -> list[dict]:
+def get_reranker():
+    """Cross-encoder для реранкинга (CPU, загружается один раз)."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                from sentence_transformers import CrossEncoder
+
+                logger.info(f"Загрузка модели реранкинга: {RERANK_MODEL}")
+                _reranker = CrossEncoder(RERANK_MODEL, device="cpu")
+    return _reranker
+
+
+def rerank_documents(query: str, documents: list[Document], top_k: int = TOP_K_RETRIEVE) -> list[Document]:
+    """
+    Второй проход по кандидатам из ChromaDB: cross-encoder оценивает пары (запрос, чанк).
+    Возвращает top_k самых релевантных; при ошибке — первые top_k кандидатов как есть.
+    """
+    if len(documents) <= 1:
+        return documents[:top_k]
+    try:
+        scores = get_reranker().predict([(query, doc.page_content) for doc in documents])
+        ranked = sorted(zip(scores, documents), key=lambda pair: pair[0], reverse=True)
+        return [doc for _, doc in ranked[:top_k]]
+    except Exception as e:
+        logger.error(f"Ошибка реранкинга: {e}")
+        return documents[:top_k]
+
+
+def extract_doc_fields(documents: list[Document]) -> list[tuple[str, object, str]]:
+    """
+    Однократное извлечение полей для форматирования: (source, page, page_content).
+    Результат используется и для контекста промпта, и для списка источников.
+    """
+    return [
+        (doc.metadata.get("source", "unknown"), doc.metadata.get("page", "?"), doc.page_content)
+        for doc in documents
+    ]
+
+
+def format_sources(doc_fields: list[tuple[str, object, str]]) -> list[dict]:
     """
-    Форматирование источников из найденных документов.
+    Форматирование источников из полей найденных документов (см. extract_doc_fields).
     Возвращает уникальный список {filename, page} для отображения в UI.
     """
-    seen = set()
-    sources = []
-    for doc in documents:
-        source = doc.metadata.get("source", "unknown")
-        page = doc.metadata.get("page", "?")
-        key = f"{source}_p{page}"
+    seen: set[tuple[str, object]] = set()
+    sources: list[dict] = []
+    for source, page, content in doc_fields:
+        key = (source, page)
         if key not in seen:
             seen.add(key)
             sources.append({
                 "filename": source,
                 "page": page,
-                "snippet": doc.page_content[:150] + "..." if len(doc.page_content) > 150 else doc.page_content,
+                "snippet": content[:150] + "..." if len(content) > 150 else content,
             })
     return sources
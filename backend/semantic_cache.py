@@ -0,0 +1,135 @@
+"""
+Семантический кэш ответов — пропускает retrieval и генерацию LLM для повторных вопросов.
+Пары вопрос→ответ хранятся в отдельной коллекции ChromaDB (qa_cache, cosine) рядом
+с документами, поэтому кэш переживает перезапуск сервера.
+Попадание — косинусная близость эмбеддинга вопроса не ниже CACHE_SIM_THRESHOLD.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Optional
+
+from backend.config import CACHE_SIM_THRESHOLD, QA_CACHE_COLLECTION_NAME, SEMANTIC_CACHE_SIZE
+from backend.ingestion import get_vectorstore
+
+logger = logging.getLogger("rag-chatbot")
+
+
+class SemanticCache:
+    """
+    Кэш {эмбеддинг вопроса → (answer, sources)} в коллекции ChromaDB.
+    Ответ хранится как document записи, источники и счётчики — в metadata.
+    При переполнении вытесняется запись с наименьшим числом попаданий,
+    а среди равных — давнее всех использованная (LRU).
+    Ошибки кэша не должны ломать чат — они логируются, запрос идёт обычным путём,
+    а коллекция заново открывается при следующем обращении.
+    """
+
+    def __init__(self, max_size: int = SEMANTIC_CACHE_SIZE, threshold: float = CACHE_SIM_THRESHOLD):
+        self.max_size = max_size
+        self.threshold = threshold
+        self._collection = None
+        # Защищает только открытие коллекции, вытеснение и очистку — поиск идёт без lock
+        self._lock = threading.RLock()
+
+    def _get_collection(self):
+        """Коллекция qa_cache (создаётся при первом обращении через клиент vectorstore)."""
+        collection = self._collection
+        if collection is None:
+            with self._lock:
+                if self._collection is None:
+                    self._collection = get_vectorstore()._client.get_or_create_collection(
+                        name=QA_CACHE_COLLECTION_NAME,
+                        metadata={"hnsw:space": "cosine"},
+                    )
+                collection = self._collection
+        return collection
+
+    def lookup(self, embedding) -> Optional[dict]:
+        """Возвращает {answer, sources} самого близкого вопроса или None, если близость ниже порога."""
+        if self.max_size <= 0:
+            return None
+
+        try:
+            collection = self._get_collection()
+            result = collection.query(
+                query_embeddings=[list(embedding)],
+                n_results=1,
+                include=["documents", "metadatas", "distances"],
+            )
+        except Exception as e:
+            logger.warning(f"Семантический кэш недоступен: {e}")
+            self._collection = None
+            return None
+
+        if not result["ids"] or not result["ids"][0]:
+            return None
+
+        # Для cosine-пространства Chroma возвращает distance = 1 - similarity
+        similarity = 1.0 - result["distances"][0][0]
+        if similarity < self.threshold:
+            return None
+
+        metadata = result["metadatas"][0][0]
+        # Счётчики для вытеснения обновляются по возможности: гонка или ошибка не влияют на ответ
+        try:
+            collection.update(
+                ids=[result["ids"][0][0]],
+                metadatas=[{**metadata, "hits": metadata["hits"] + 1, "last_used": time.time()}],
+            )
+        except Exception as e:
+            logger.debug("Семантический кэш: не удалось обновить счётчики: %s", e)
+
+        logger.info("Семантический кэш: попадание (similarity=%.3f)", similarity)
+        return {"answer": result["documents"][0][0], "sources": json.loads(metadata["sources"])}
+
+    def add(self, embedding, answer: str, sources: list[dict]) -> None:
+        """Сохраняет ответ на вопрос; при переполнении вытесняет наименее ценную запись."""
+        if self.max_size <= 0:
+            return
+
+        metadata = {
+            "sources": json.dumps(sources, ensure_ascii=False),
+            "hits": 0,
+            "last_used": time.time(),
+        }
+        with self._lock:
+            try:
+                collection = self._get_collection()
+                if collection.count() >= self.max_size:
+                    existing = collection.get(include=["metadatas"])
+                    victim = min(
+                        zip(existing["ids"], existing["metadatas"]),
+                        key=lambda item: (item[1]["hits"], item[1]["last_used"]),
+                    )
+                    collection.delete(ids=[victim[0]])
+                collection.add(
+                    ids=[uuid.uuid4().hex],
+                    embeddings=[list(embedding)],
+                    documents=[answer],
+                    metadatas=[metadata],
+                )
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить ответ в семантический кэш: {e}")
+                self._collection = None
+
+    def clear(self) -> None:
+        """Очистка кэша (нужна после изменения набора документов): записи удаляются, коллекция остаётся."""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            try:
+                collection = self._get_collection()
+                ids = collection.get(include=[])["ids"]
+                if ids:
+                    collection.delete(ids=ids)
+            except Exception as e:
+                logger.warning(f"Не удалось очистить семантический кэш: {e}")
+                self._collection = None
+
+
+semantic_cache = SemanticCache()
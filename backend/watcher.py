@@ -10,7 +10,10 @@ Watchdog-мониторинг папки documents/.
   - Перемещение файла → удаление старого + индексация нового
 """
 
+import hashlib
 import logging
+import os
+import queue
 import threading
 import time
 from pathlib import Path
@@ -18,131 +21,211 @@ from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 
-from backend.config import DOCUMENTS_DIR
+from backend.config import ALLOWED_EXTENSIONS, DOCUMENTS_DIR
 from backend.ingestion import (
-    ingest_file,
+    ingest_files_batch,
     delete_document_from_db,
-    get_vectorstore,
-    get_embeddings,
     get_relative_source,
 )
 from backend.retriever import reset_vectorstore_cache
 
 logger = logging.getLogger("rag-chatbot")
 
-# Поддерживаемые расширения
-ALLOWED_EXTENSIONS = {".pdf", ".docx", ".doc", ".txt"}
-
-# Задержка перед индексацией (секунды) — даём файлу полностью записаться
+# Задержка перед индексацией (секунды) — даём файлу полностью записаться.
+# Отсчитывается от последнего события в папке: пачка файлов индексируется вместе
 DEBOUNCE_DELAY = 3.0
 
-# Глобальный lock — предотвращаем одновременные операции с ChromaDB и embeddings
-_processing_lock = threading.Lock()
+# Максимальная задержка пачки при непрерывном потоке событий (секунды)
+BATCH_MAX_WAIT = 30.0
+
+# Сколько байт начала файла хэшируется для отпечатка
+FINGERPRINT_HEAD_BYTES = 64 * 1024
+
 
+def _fingerprint(path: Path) -> tuple[float, int, bytes]:
+    """Отпечаток файла: (mtime, размер, sha1 первых FINGERPRINT_HEAD_BYTES байт)."""
+    stat = path.stat()
+    with open(path, "rb") as f:
+        head_hash = hashlib.sha1(f.read(FINGERPRINT_HEAD_BYTES)).digest()
+    return stat.st_mtime, stat.st_size, head_hash
 
-def _is_supported(path: Path) -> bool:
-    """Проверяет что файл поддерживаемый и не временный."""
+
+def _is_supported(src_path: str) -> bool:
+    """
+    Проверяет что файл поддерживаемый и не временный.
+    Работает со строкой пути из события — Path создаётся только для подходящих файлов.
+    """
+    name = os.path.basename(src_path)
     # Игнорируем временные файлы Word (~$filename.doc) и скрытые файлы
-    if path.name.startswith("~$") or path.name.startswith("."):
+    if name.startswith(("~$", ".")):
         return False
-    return path.suffix.lower() in ALLOWED_EXTENSIONS
+    return name.lower().endswith(ALLOWED_EXTENSIONS)
 
 
 class DocumentEventHandler(FileSystemEventHandler):
     """
     Обработчик событий файловой системы для папки documents/.
-    Использует debounce — откладывает индексацию на DEBOUNCE_DELAY секунд,
-    чтобы файл успел полностью записаться на диск.
+    Потоки watchdog только ставят операции в очередь; единственный рабочий поток
+    (run_worker) выполняет их последовательно — без глобального lock на ChromaDB.
+    Debounce: операции копятся, пока в папке идут события, и применяются одной пачкой
+    через DEBOUNCE_DELAY секунд тишины (но не позже BATCH_MAX_WAIT от первого события).
     """
 
     def __init__(self):
         super().__init__()
-        # Таймеры для debounce — {путь_файла: Timer}
-        self._timers: dict[str, threading.Timer] = {}
-        self._lock = threading.Lock()
-
-    def _debounce(self, key: str, callback, *args):
-        """Откладывает вызов callback на DEBOUNCE_DELAY секунд. Повторный вызов сбрасывает таймер."""
-        with self._lock:
-            if key in self._timers:
-                self._timers[key].cancel()
-            timer = threading.Timer(DEBOUNCE_DELAY, callback, args=args)
-            self._timers[key] = timer
-            timer.start()
-
-    def _index_file(self, file_path: Path):
-        """Индексация одного файла в ChromaDB (thread-safe)."""
-        with _processing_lock:
+        # Очередь операций (операция, путь); None — сигнал остановки рабочего потока
+        self._queue: queue.Queue = queue.Queue()
+        # Отпечатки последней успешной индексации — {путь_файла: (mtime, size, sha1)}.
+        # Редакторы сохраняют файл серией modified/moved событий; без изменений — не переиндексируем
+        self._fingerprints: dict[str, tuple[float, int, bytes]] = {}
+
+    def _enqueue(self, operation: str, path: Path):
+        """Ставит операцию "index"/"delete" над файлом в очередь рабочего потока."""
+        self._queue.put((operation, path))
+
+    def stop(self):
+        """Останавливает рабочий поток (отложенные операции отбрасываются)."""
+        self._queue.put(None)
+
+    def run_worker(self):
+        """
+        Цикл рабочего потока. Повторные события по одному файлу схлопываются:
+        выполняется только последняя операция.
+        """
+        # {путь_файла: (операция, Path)}
+        pending: dict[str, tuple[str, Path]] = {}
+        first_event = last_event = 0.0
+        while True:
+            timeout = None
+            if pending:
+                flush_at = min(last_event + DEBOUNCE_DELAY, first_event + BATCH_MAX_WAIT)
+                timeout = max(0.0, flush_at - time.monotonic())
             try:
-                # Проверяем что файл всё ещё существует (мог быть удалён за время debounce)
-                if not file_path.exists():
-                    return
-                source_name = get_relative_source(file_path)
-                logger.info(f"[Watcher] Индексация файла: {source_name}")
-                embeddings = get_embeddings()
-                vectorstore = get_vectorstore(embeddings)
-                chunks_count = ingest_file(file_path, vectorstore)
-                reset_vectorstore_cache()
-                logger.info(f"[Watcher] ✅ {source_name}: {chunks_count} чанков добавлено")
-            except Exception as e:
-                logger.error(f"[Watcher] Ошибка индексации {file_path.name}: {e}")
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                return
+
+            now = time.monotonic()
+            if item:
+                operation, path = item
+                if not pending:
+                    first_event = now
+                last_event = now
+                pending[str(path)] = (operation, path)
+
+            if pending and now >= min(last_event + DEBOUNCE_DELAY, first_event + BATCH_MAX_WAIT):
+                self._flush(list(pending.values()))
+                pending.clear()
+
+    def _flush(self, operations: list[tuple[str, Path]]):
+        """Применяет накопленные операции: удаления по одному, индексация — одной пачкой."""
+        changed = False
+        for operation, path in operations:
+            if operation == "delete":
+                self._delete_file(path)
+                changed = True
+
+        to_index = [path for operation, path in operations if operation == "index"]
+        if to_index and self._index_files(to_index):
+            changed = True
+
+        if changed:
+            # Один сброс кэша на всю пачку
+            reset_vectorstore_cache()
+
+    def _index_files(self, paths: list[Path]) -> bool:
+        """
+        Пакетная индексация файлов в ChromaDB (вызывается только из рабочего потока).
+        Возвращает True, если индекс мог измениться.
+        """
+        fingerprints = {}
+        for file_path in paths:
+            # Проверяем что файл всё ещё существует (мог быть удалён за время debounce)
+            if not file_path.exists():
+                continue
+            try:
+                fingerprint = _fingerprint(file_path)
+            except OSError as e:
+                logger.error(f"[Watcher] Не удалось прочитать {file_path.name}: {e}")
+                continue
+            if self._fingerprints.get(str(file_path)) == fingerprint:
+                logger.info("[Watcher] %s не изменился — пропуск", file_path.name)
+                continue
+            fingerprints[file_path] = fingerprint
+
+        if not fingerprints:
+            return False
+
+        logger.info("[Watcher] Индексация файлов: %d", len(fingerprints))
+        try:
+            results = ingest_files_batch(list(fingerprints))
+        except Exception as e:
+            logger.error(f"[Watcher] Ошибка пакетной индексации: {e}")
+            return True
+
+        for file_path, fingerprint in fingerprints.items():
+            source_name = get_relative_source(file_path)
+            chunks_count = results.get(source_name, 0)
+            if chunks_count:
+                self._fingerprints[str(file_path)] = fingerprint
+                logger.info("[Watcher] ✅ %s: %d чанков добавлено", source_name, chunks_count)
+            else:
+                logger.warning("[Watcher] ⚠️ %s: чанки не добавлены", source_name)
+        return True
 
     def _delete_file(self, file_path: Path):
-        """Удаление чанков файла из ChromaDB (thread-safe)."""
-        with _processing_lock:
-            try:
-                source_name = get_relative_source(file_path)
-                logger.info(f"[Watcher] Удаление из индекса: {source_name}")
-                deleted = delete_document_from_db(source_name)
-                reset_vectorstore_cache()
-                logger.info(f"[Watcher] 🗑️ {source_name}: удалено {deleted} чанков")
-            except Exception as e:
-                logger.error(f"[Watcher] Ошибка удаления {file_path.name}: {e}")
+        """Удаление чанков файла из ChromaDB (вызывается только из рабочего потока)."""
+        self._fingerprints.pop(str(file_path), None)
+        try:
+            source_name = get_relative_source(file_path)
+            logger.info("[Watcher] Удаление из индекса: %s", source_name)
+            deleted = delete_document_from_db(source_name)
+            logger.info("[Watcher] 🗑️ %s: удалено %d чанков", source_name, deleted)
+        except Exception as e:
+            logger.error(f"[Watcher] Ошибка удаления {file_path.name}: {e}")
 
     def on_created(self, event: FileSystemEvent):
         """Файл создан — индексируем с задержкой."""
         if event.is_directory:
             return
-        path = Path(event.src_path)
-        if _is_supported(path):
-            self._debounce(str(path), self._index_file, path)
+        if _is_supported(event.src_path):
+            self._enqueue("index", Path(event.src_path))
 
     def on_modified(self, event: FileSystemEvent):
         """Файл изменён — переиндексируем с задержкой (дедупликация встроена)."""
         if event.is_directory:
             return
-        path = Path(event.src_path)
-        if _is_supported(path):
-            self._debounce(str(path), self._index_file, path)
+        if _is_supported(event.src_path):
+            self._enqueue("index", Path(event.src_path))
 
     def on_deleted(self, event: FileSystemEvent):
         """Файл удалён — удаляем чанки из ChromaDB."""
         if event.is_directory:
             return
-        path = Path(event.src_path)
-        if _is_supported(path):
-            self._debounce(str(path), self._delete_file, path)
+        if _is_supported(event.src_path):
+            self._enqueue("delete", Path(event.src_path))
 
     def on_moved(self, event: FileSystemEvent):
         """Файл перемещён/переименован — удаляем старый, индексируем новый."""
         if event.is_directory:
             return
-        old_path = Path(event.src_path)
-        new_path = Path(event.dest_path)
-
-        if _is_supported(old_path):
-            self._debounce(str(old_path), self._delete_file, old_path)
-        if _is_supported(new_path):
-            self._debounce(str(new_path), self._index_file, new_path)
+        if _is_supported(event.src_path):
+            self._enqueue("delete", Path(event.src_path))
+        if _is_supported(event.dest_path):
+            self._enqueue("index", Path(event.dest_path))
 
 
-# === Глобальный observer ===
+# === Глобальный observer и рабочий поток ===
 _observer: Observer | None = None
+_handler: DocumentEventHandler | None = None
+_worker: threading.Thread | None = None
 
 
 def start_watcher():
     """Запуск watchdog-мониторинга папки documents/."""
-    global _observer
+    global _observer, _handler, _worker
 
     if _observer is not None:
         logger.warning("[Watcher] Уже запущен")
@@ -151,10 +234,14 @@ def start_watcher():
     # Создаём папку если не существует
     DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
 
-    handler = DocumentEventHandler()
+    _handler = DocumentEventHandler()
+    # Единственный поток, который пишет в ChromaDB по событиям watcher
+    _worker = threading.Thread(target=_handler.run_worker, name="watcher-worker", daemon=True)
+    _worker.start()
+
     _observer = Observer()
     # recursive=True — мониторим вложенные папки тоже
-    _observer.schedule(handler, str(DOCUMENTS_DIR), recursive=True)
+    _observer.schedule(_handler, str(DOCUMENTS_DIR), recursive=True)
     _observer.daemon = True  # Завершается вместе с основным процессом
     _observer.start()
 
@@ -163,7 +250,7 @@ def start_watcher():
 
 def stop_watcher():
     """Остановка watchdog-мониторинга."""
-    global _observer
+    global _observer, _handler, _worker
 
     if _observer is None:
         return
@@ -171,4 +258,9 @@ def stop_watcher():
     _observer.stop()
     _observer.join(timeout=5)
     _observer = None
+
+    _handler.stop()
+    _worker.join(timeout=5)
+    _handler = None
+    _worker = None
     logger.info("[Watcher] Мониторинг остановлен")
@@ -96,9 +96,28 @@ export async function streamChat(
   }
 }
 
-export async function uploadFile(
-  file: File,
-): Promise<{ status: string; filename: string; chunks_count: number; message: string }> {
+export interface UploadJob {
+  job_id: string;
+  status: "queued" | "processing" | "ok" | "error";
+  filename: string;
+  chunks_count: number;
+  message: string;
+}
+
+const UPLOAD_POLL_INTERVAL_MS = 1000;
+
+export async function getUploadJob(jobId: string): Promise<UploadJob> {
+  const response = await fetch(`${API_BASE}/upload/${encodeURIComponent(jobId)}`);
+
+  if (!response.ok) {
+    const err = await response.text();
+    throw new Error(`Ошибка получения статуса загрузки: ${response.status} — ${err}`);
+  }
+
+  return response.json();
+}
+
+export async function uploadFile(file: File): Promise<UploadJob> {
   const formData = new FormData();
   formData.append("file", file);
 
@@ -112,7 +131,18 @@ export async function uploadFile(
     throw new Error(`Ошибка загрузки: ${response.status} — ${err}`);
   }
 
-  return response.json();
+  // Индексация идёт в фоне — опрашиваем статус задачи до завершения
+  let job: UploadJob = await response.json();
+  while (job.status === "queued" || job.status === "processing") {
+    await new Promise((resolve) => setTimeout(resolve, UPLOAD_POLL_INTERVAL_MS));
+    job = await getUploadJob(job.job_id);
+  }
+
+  if (job.status === "error") {
+    throw new Error(job.message);
+  }
+
+  return job;
 }
 
 export async function getDocuments(): Promise<DocumentInfo[]> {